@@ -1,12 +1,264 @@
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
 import os
 import sqlite3
+import hashlib
+import io
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import parquet_store
+import api_snapshots
+import data_quality
 
 # --- KONFIGURASI ---
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_data_warehouse.db')
+# SALESREPORT_DB: lokasi database alternatif (dipakai benchmark.py)
+db_path = os.environ.get('SALESREPORT_DB',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_data_warehouse.db'))
 engine = create_engine(f'sqlite:///{db_path}')
 
+# Tabel agregat yang dibaca oleh dashboard (app.py & dashboard.py).
+# Dibangun ulang setelah step LOAD supaya query dashboard cukup membaca
+# beberapa ratus baris, bukan scan seluruh FactSales.
+# 'scope' = (kolom di tabel agregat, ekspresi SQL sumber) yang dipakai mode
+# incremental untuk me-refresh hanya periode/produk yang tersentuh; {where}
+# diisi filter scope tersebut (kosong saat full rebuild).
+AGGREGATE_TABLES = {
+    # Sales & jumlah order per bulan (sumber KPI dan trend bulanan)
+    'AggSalesMonthly': {
+        'scope': ('Order_Year', "Order_Year"),
+        'select': """
+            SELECT Order_Year,
+                   CASE WHEN Order_Year IS NOT NULL
+                        THEN printf('%04d-%02d', Order_Year, Order_Month) END AS Year_Month,
+                   SUM(Sales_Amount) AS Total_Sales,
+                   COUNT(*) AS Total_Orders
+            FROM FactSales
+            {where}
+            GROUP BY Order_Year, Order_Month
+        """,
+    },
+    # Sales per produk per tahun (sumber Top 5 Produk dengan filter tahun).
+    # Sales semua versi produk (SCD) dijumlahkan di bawah nama versi aktif (c).
+    'AggProductYearly': {
+        'scope': ('Order_Year', "f.Order_Year"),
+        'select': """
+            SELECT f.Order_Year,
+                   c.Product_Name,
+                   SUM(f.Sales_Amount) AS Total_Sales
+            FROM FactSales f
+            JOIN DimProduct p ON p.Product_SK = f.Product_SK
+            JOIN DimProduct c ON c.Product_Key = p.Product_Key AND c.Is_Current = 1
+            {where}
+            GROUP BY f.Order_Year, c.Product_Name
+        """,
+    },
+    # Total sales per produk sepanjang waktu (sumber halaman Products);
+    # atribut (nama, line) dari versi aktif, sales dari semua versi
+    'AggProductSales': {
+        'scope': ('Product_Name', "c.Product_Name"),
+        'select': """
+            SELECT c.Product_Name, c.Product_Line, IFNULL(SUM(f.Sales_Amount), 0) AS Total_Sales
+            FROM DimProduct c
+            JOIN DimProduct p ON p.Product_Key = c.Product_Key AND c.Is_Current = 1
+            LEFT JOIN FactSales f ON f.Product_SK = p.Product_SK
+            {where}
+            GROUP BY c.Product_Name
+        """,
+    },
+}
+
+AGGREGATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_aggsalesmonthly_year ON AggSalesMonthly (Order_Year)",
+    "CREATE INDEX IF NOT EXISTS idx_aggproductyearly_year ON AggProductYearly (Order_Year, Total_Sales)",
+    # Keyset pagination daftar produk: urut sales / nama (+ Product_Name sebagai tiebreak)
+    "CREATE INDEX IF NOT EXISTS idx_aggproductsales_sales ON AggProductSales (Total_Sales, Product_Name)",
+    "CREATE INDEX IF NOT EXISTS idx_aggproductsales_name ON AggProductSales (Product_Name COLLATE NOCASE, Product_Name)",
+]
+
+# Skema kolom sales_details.csv. Dibaca langsung dengan tipe yang benar
+# (bukan dtype=str lalu dikonversi per baris) supaya hemat memori & cepat.
+# Tanggal dibaca sebagai teks 'YYYYMMDD' lalu di-parse vektor dengan SALES_DATE_FORMAT.
+SALES_DTYPES = {
+    'sls_ord_num': 'string',
+    'sls_prd_key': 'category',
+    'sls_cust_id': 'Int32',
+    'sls_order_dt': 'string',
+    'sls_ship_dt': 'string',
+    'sls_due_dt': 'string',
+    'sls_sales': 'float64',
+    'sls_quantity': 'float64',
+    'sls_price': 'float64',
+}
+# Customer ID selalu dibaca sebagai teks lalu dikonversi text_to_int: read_csv
+# bertipe Int32 crash pada '11000.5' dan diam-diam overflow pada '9999999999'
+# (-> ID customer lain). Nilai seperti itu jadi <NA> -> ORPHAN_CUSTOMER.
+SALES_READ_DTYPES = {**SALES_DTYPES, 'sls_cust_id': str}
+# Mode chunk: kolom angka & ID dibaca sebagai teks lalu dikonversi per chunk
+# (coerce_sales_types), jadi nilai kotor tidak memaksa file dibaca ulang
+SALES_CHUNK_DTYPES = {col: (str if dtype in ('float64', 'Int32') else dtype)
+                      for col, dtype in SALES_DTYPES.items()}
+SALES_DATE_COLUMNS = ['sls_order_dt', 'sls_ship_dt', 'sls_due_dt']
+SALES_DATE_FORMAT = '%Y%m%d'
+
+# Jumlah baris per executemany saat menulis ke SQLite
+SQL_BATCH_SIZE = 10_000
+
+# PRAGMA untuk koneksi load. WAL: pembaca (app.py/dashboard.py) tetap membaca
+# snapshot lama selama load berjalan. synchronous=NORMAL aman untuk WAL.
+BULK_LOAD_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -131072,  # 128 MB (nilai negatif = KiB)
+    'temp_store': 'MEMORY',
+}
+
+# Star schema warehouse. {name} = nama tabel (live atau <tabel>__staging).
+# Full load menulis ke <tabel>__staging lalu di-swap ke nama aslinya.
+# Order_Year/Order_Month disimpan sebagai INTEGER supaya filter tahun memakai
+# index (range scan), bukan strftime() per baris.
+WAREHOUSE_SCHEMA = {
+    'DimProduct': """
+        CREATE TABLE {name} (
+            Product_SK INTEGER PRIMARY KEY,
+            Product_ID INTEGER NOT NULL,
+            Product_Key TEXT NOT NULL,
+            Category_ID TEXT,
+            Product_Name TEXT NOT NULL,
+            Product_Cost REAL,
+            Product_Line TEXT,
+            Category TEXT,
+            Subcategory TEXT,
+            Maintenance TEXT,
+            Start_Date TEXT,
+            End_Date TEXT,
+            Is_Current INTEGER NOT NULL
+        )
+    """,
+    'DimCustomer': """
+        CREATE TABLE {name} (
+            Customer_ID INTEGER PRIMARY KEY,
+            Customer_Key TEXT,
+            First_Name TEXT,
+            Last_Name TEXT,
+            Full_Name TEXT NOT NULL COLLATE NOCASE,
+            Marital_Status TEXT,
+            Gender TEXT,
+            Birthdate TEXT,
+            Country TEXT NOT NULL,
+            Create_Date TEXT
+        )
+    """,
+    'FactSales': """
+        CREATE TABLE {name} (
+            Order_Number TEXT NOT NULL,
+            Product_Key TEXT NOT NULL,
+            Product_SK INTEGER REFERENCES DimProduct (Product_SK),
+            Customer_ID INTEGER REFERENCES DimCustomer (Customer_ID),
+            Order_Date TEXT,
+            Ship_Date TEXT,
+            Due_Date TEXT,
+            Order_Year INTEGER,
+            Order_Month INTEGER,
+            Sales_Amount REAL NOT NULL,
+            Quantity INTEGER NOT NULL,
+            Unit_Price REAL
+        )
+    """,
+}
+WAREHOUSE_TABLES = ['FactSales', 'DimProduct', 'DimCustomer']
+STAGING_SUFFIX = '__staging'
+# Index dibuat setelah data masuk (deferred) -> lihat swap_staging_tables()
+WAREHOUSE_INDEXES = [
+    # Baris order (upsert incremental per Order_Number). Sengaja tidak UNIQUE:
+    # baris ganda ditolak validasi (DUPLICATE_LINE), dengan --no-validate tetap
+    # dimuat apa adanya seperti perilaku awal.
+    "CREATE INDEX IF NOT EXISTS idx_factsales_order_line ON FactSales (Order_Number, Product_Key)",
+    # Foreign key fakta -> dimensi
+    "CREATE INDEX IF NOT EXISTS idx_factsales_product_sk ON FactSales (Product_SK)",
+    "CREATE INDEX IF NOT EXISTS idx_factsales_customer_id ON FactSales (Customer_ID)",
+    # Filter tahun/bulan (range scan) dan pencarian per tanggal order
+    "CREATE INDEX IF NOT EXISTS idx_factsales_year_month ON FactSales (Order_Year, Order_Month)",
+    "CREATE INDEX IF NOT EXISTS idx_factsales_order_date ON FactSales (Order_Date)",
+    # Lookup versi produk berdasarkan business key + versi aktif (SCD type 2)
+    "CREATE INDEX IF NOT EXISTS idx_dimproduct_key ON DimProduct (Product_Key, Start_Date)",
+    "CREATE INDEX IF NOT EXISTS idx_dimproduct_current ON DimProduct (Product_Key) WHERE Is_Current = 1",
+    # Keyset pagination + prefix search daftar customer (lihat warehouse_lists.py)
+    "CREATE INDEX IF NOT EXISTS idx_dimcustomer_name ON DimCustomer (Full_Name, Customer_ID)",
+    "CREATE INDEX IF NOT EXISTS idx_dimcustomer_country ON DimCustomer (Country, Customer_ID)",
+]
+# Urutan kolom FactSales yang dimuat (harus cocok dengan WAREHOUSE_SCHEMA)
+FACT_COLUMNS = [
+    'Order_Number', 'Product_Key', 'Product_SK', 'Customer_ID', 'Order_Date', 'Ship_Date',
+    'Due_Date', 'Order_Year', 'Order_Month', 'Sales_Amount', 'Quantity', 'Unit_Price',
+]
+
+# Metadata ETL: high-water mark per file sumber untuk mode incremental
+# Semua file sumber (path relatif terhadap folder data). Path ini juga
+# dipakai sebagai kunci Source di tabel EtlMetadata.
+SOURCE_FILES = {
+    'crm_sales': 'source_crm/sales_details.csv',
+    'crm_customers': 'source_crm/cust_info.csv',
+    'crm_products': 'source_crm/prd_info.csv',
+    'erp_customers': 'source_erp/CUST_AZ12.csv',
+    'erp_locations': 'source_erp/LOC_A101.csv',
+    'erp_categories': 'source_erp/PX_CAT_G1V2.csv',
+}
+SALES_SOURCE = SOURCE_FILES['crm_sales']
+# Sumber yang membentuk tiap dimensi (dimensi di-upsert jika salah satunya berubah)
+CUSTOMER_SOURCES = ['crm_customers', 'erp_customers', 'erp_locations']
+PRODUCT_SOURCES = ['crm_products', 'erp_categories']
+
+# Normalisasi nilai kode dari CRM/ERP
+GENDER_MAP = {'M': 'Male', 'MALE': 'Male', 'F': 'Female', 'FEMALE': 'Female'}
+MARITAL_STATUS_MAP = {'M': 'Married', 'S': 'Single'}
+COUNTRY_MAP = {'DE': 'Germany', 'US': 'United States', 'USA': 'United States'}
+
+ETL_METADATA_DDL = """
+    CREATE TABLE IF NOT EXISTS EtlMetadata (
+        Source TEXT PRIMARY KEY,
+        Checksum TEXT,
+        File_Size INTEGER,
+        File_Mtime REAL,
+        Row_Count INTEGER,
+        Last_Order_Date TEXT,
+        Last_Order_Number TEXT,
+        Loaded_At TEXT
+    )
+"""
+
+class StageTimer:
+    """Mencatat durasi setiap stage ETL (akumulatif jika stage dipanggil berkali-kali)"""
+
+    def __init__(self):
+        self.durations = {}
+        self.sources = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self):
+        print("\n=== LAPORAN WAKTU PER STAGE ===")
+        total = sum(self.durations.values())
+        for name, seconds in self.durations.items():
+            share = seconds / total * 100 if total else 0
+            print(f"   {name:<20} {seconds:8.3f} s  ({share:5.1f}%)")
+        print(f"   {'TOTAL':<20} {total:8.3f} s")
+        if self.sources:
+            print("   Extract per sumber (wall-clock di worker):")
+            for name, seconds in self.sources.items():
+                print(f"     {name:<18} {seconds:8.3f} s")
+
 def find_data_directory():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     print(f"Mencari folder 'source_crm' di: {current_dir}")
@@ -27,93 +279,944 @@ def debug_print_file_head(filepath):
     except Exception as e:
         print(f"Gagal membaca file: {e}")
 
-def run_etl():
-    print("\n=== MEMULAI PROSES ETL (VERSI DIAGNOSIS) ===")
-    BASE_DIR = find_data_directory()
-    
-    # --- 1. EXTRACT ---
-    sales_path = os.path.join(BASE_DIR, 'source_crm', 'sales_details.csv')
-    cust_path = os.path.join(BASE_DIR, 'source_crm', 'cust_info.csv')
-    prd_path = os.path.join(BASE_DIR, 'source_crm', 'prd_info.csv')
-    
-    # Debug print
-    debug_print_file_head(sales_path)
+def build_dim_product(df_prd_crm):
+    """Membangun DimProduct SCD type 2: satu baris per versi produk.
 
-    print("\n-> Membaca CSV dengan Pandas...")
-    # Gunakan encoding latin1 dan paksa semua jadi string dulu biar tidak error parsing
-    df_sales = pd.read_csv(sales_path, dtype=str, encoding='latin1')
-    print(f"   [OK] Sales terbaca: {len(df_sales)} baris")
+    Product_SK = surrogate key per versi. Rentang berlaku sebuah versi adalah
+    Start_Date s/d sehari sebelum Start_Date versi berikutnya dengan Product_Key
+    sama; prd_end_dt dari CRM tidak dipakai karena sering lebih kecil dari
+    prd_start_dt. Versi terakhir: End_Date kosong, Is_Current = 1.
+    """
+    df = df_prd_crm.copy()
+    df['prd_key'] = df['prd_key'].astype(str).str.strip().str.upper()
+    df['prd_line'] = df['prd_line'].str.strip()
+    # 'CO-RF-FR-R92B-58' -> Category_ID 'CO_RF', Product_Key 'FR-R92B-58' (sama dengan sls_prd_key)
+    df['Category_ID'] = df['prd_key'].str[:5].str.replace('-', '_')
+    df['Product_Key'] = df['prd_key'].str[6:]
+    df['Start_Date'] = pd.to_datetime(df['prd_start_dt'], errors='coerce')
 
-    df_cust_crm = pd.read_csv(cust_path, encoding='latin1')
-    df_prd_crm = pd.read_csv(prd_path, encoding='latin1')
-    
-    # --- 2. TRANSFORM ---
-    print("\n-> Transformasi Data...")
+    df = df.sort_values('prd_id').reset_index(drop=True)
+    df['Product_SK'] = range(1, len(df) + 1)
 
-    # A. FIX FORMAT TANGGAL (Penyebab utama data 0)
-    # Format di CSV: 20140128 (String sambung tanpa spasi/strip)
-    # Kita ubah manual stringnya menjadi format YYYY-MM-DD agar SQLite paham
-    def fix_date_format(val):
-        s = str(val).strip()
-        if len(s) == 8 and s.isdigit():
-            return f"{s[:4]}-{s[4:6]}-{s[6:]}" # 2014-01-28
-        return None # Jika format aneh, biarkan kosong
-
-    print("   ...Memperbaiki format tanggal...")
-    date_cols = ['sls_order_dt', 'sls_ship_dt', 'sls_due_dt']
-    for col in date_cols:
-        # Terapkan fungsi fix manual
-        df_sales[col] = df_sales[col].apply(fix_date_format)
-        # Pastikan tipe datanya datetime
-        df_sales[col] = pd.to_datetime(df_sales[col], errors='coerce')
+    versions = df.sort_values(['Product_Key', 'Start_Date', 'prd_id'])
+    next_start = versions.groupby('Product_Key')['Start_Date'].shift(-1)
+    df['End_Date'] = next_start - pd.Timedelta(days=1)
+    df['Is_Current'] = (~versions['Product_Key'].duplicated(keep='last')).astype('int8')
 
-    # B. FIX ANGKA (Sales Amount)
-    print("   ...Memperbaiki angka penjualan...")
-    df_sales['sls_sales'] = pd.to_numeric(df_sales['sls_sales'], errors='coerce').fillna(0)
-    df_sales['sls_quantity'] = pd.to_numeric(df_sales['sls_quantity'], errors='coerce').fillna(0)
-    
-    # C. RENAME KOLOM
-    fact_sales = df_sales.rename(columns={
+    return df.rename(columns={
+        'prd_id': 'Product_ID', 'prd_nm': 'Product_Name',
+        'prd_cost': 'Product_Cost', 'prd_line': 'Product_Line'
+    })[['Product_SK', 'Product_ID', 'Product_Key', 'Category_ID', 'Product_Name',
+        'Product_Cost', 'Product_Line', 'Start_Date', 'End_Date', 'Is_Current']]
+
+def enrich_dim_product(dim_product, erp_categories):
+    """Tambah Category/Subcategory/Maintenance dari ERP (PX_CAT_G1V2) via Category_ID"""
+    return dim_product.merge(erp_categories, on='Category_ID', how='left')
+
+def build_product_lookup(dim_product):
+    """Indeks as-of versi produk, dibangun sekali per run (dipakai resolve_product_sk).
+
+    Versi diurutkan per (Product_Key, Start_Date) dan dikodekan sebagai satu
+    int64: kode Product_Key di 32 bit atas, hari sejak epoch di 32 bit bawah.
+    Lookup per chunk cukup satu np.searchsorted, tanpa sort/merge baris sales.
+    """
+    versions = dim_product.sort_values(['Product_Key', 'Start_Date', 'Product_SK'])
+    keys = pd.Index(versions['Product_Key'].astype(str).unique())
+    key_code = keys.get_indexer(versions['Product_Key'].astype(str))
+    return {
+        'keys': keys,
+        'key_code': key_code,
+        'composite': _asof_composite(key_code, versions['Start_Date']),
+        'product_sk': versions['Product_SK'].to_numpy(),
+        # Versi paling awal per Product_Key (posisi pertama tiap kode)
+        'first_sk': versions['Product_SK'].to_numpy()[np.searchsorted(key_code, np.arange(len(keys)))],
+    }
+
+def _asof_composite(key_code, dates):
+    """(kode key, tanggal) -> int64 yang urutannya sama; NaT = sebelum semua tanggal"""
+    days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype('int64')
+    days = np.where(pd.isna(dates).to_numpy(), 0, np.clip(days + 2 ** 31, 1, 2 ** 32 - 1))
+    return (np.asarray(key_code, dtype='int64') << 32) | days
+
+def resolve_product_sk(fact_sales, lookup):
+    """Mencari Product_SK untuk setiap baris sales berdasarkan Product_Key + Order_Date.
+
+    Versi produk yang dipilih adalah versi yang berlaku pada Order_Date, yaitu
+    versi terakhir yang Start_Date-nya <= Order_Date (as-of lookup). Order yang
+    lebih tua dari versi pertama, atau tanpa tanggal, diarahkan ke versi paling
+    awal produk tersebut. Product_Key yang tidak dikenal -> <NA>.
+    """
+    product_key = fact_sales['Product_Key']
+    if isinstance(product_key.dtype, pd.CategoricalDtype):
+        # Kategori dipetakan sekali, baris cukup lewat kode kategorinya
+        mapped = lookup['keys'].get_indexer(product_key.cat.categories.astype(str))
+        codes = product_key.cat.codes.to_numpy()
+        key_code = np.where(codes >= 0, mapped[codes], -1)
+    else:
+        key_code = lookup['keys'].get_indexer(product_key.astype(str))
+
+    known = key_code >= 0
+    pos = np.searchsorted(lookup['composite'], _asof_composite(key_code, fact_sales['Order_Date']),
+                          side='right') - 1
+    pos = np.clip(pos, 0, None)
+    in_range = known & (lookup['key_code'][pos] == key_code)
+    safe_code = np.where(known, key_code, 0)
+    product_sk = np.where(in_range, lookup['product_sk'][pos], lookup['first_sk'][safe_code])
+    return pd.Series(product_sk, index=fact_sales.index).astype('Int64').where(known)
+
+def _scope_filter(expr, values, params):
+    """Membuat klausa WHERE 'expr IN (...)' untuk refresh agregat sebagian"""
+    values = list(values)
+    clauses = []
+    names = []
+    for i, val in enumerate(v for v in values if v is not None):
+        names.append(f":scope_{i}")
+        params[f"scope_{i}"] = val
+    if names:
+        clauses.append(f"{expr} IN ({', '.join(names)})")
+    if any(v is None for v in values):
+        clauses.append(f"{expr} IS NULL")
+    return "WHERE " + " OR ".join(clauses) if clauses else "WHERE 0"
+
+def build_aggregates(conn):
+    """Membuat ulang semua tabel agregat dari FactSales/DimProduct"""
+    for table, agg in AGGREGATE_TABLES.items():
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} AS {agg['select'].format(where='')}")
+    for ddl in AGGREGATE_INDEXES:
+        conn.execute(ddl)
+
+def refresh_aggregates(conn, touched):
+    """Refresh agregat hanya untuk scope yang tersentuh.
+
+    touched: dict {kolom scope: set nilai}, misal {'Order_Year': {'2014'},
+    'Product_Name': {...}}. Tabel yang scope-nya tidak ada di dict dibiarkan.
+    """
+    for table, agg in AGGREGATE_TABLES.items():
+        column, expr = agg['scope']
+        values = touched.get(column)
+        if not values:
+            continue
+        params = {}
+        delete_where = _scope_filter(column, values, params)
+        conn.execute(f"DELETE FROM {table} {delete_where}", params)
+        params = {}
+        source_where = _scope_filter(expr, values, params)
+        conn.execute(f"INSERT INTO {table} {agg['select'].format(where=source_where)}", params)
+
+# --- BULK LOADER SQLITE ---
+def connect_warehouse():
+    """Koneksi sqlite3 untuk proses load dengan PRAGMA khusus bulk load.
+
+    isolation_level=None: transaksi diatur manual lewat bulk_transaction(),
+    supaya DDL (DROP/RENAME) ikut di dalam transaksi yang sama.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    for pragma, value in BULK_LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+@contextmanager
+def bulk_transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT; ROLLBACK jika ada error"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def sqlite_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+def create_warehouse_table(conn, table, name):
+    """CREATE TABLE sesuai WAREHOUSE_SCHEMA[table] dengan nama 'name'"""
+    conn.execute(f"DROP TABLE IF EXISTS {name}")
+    conn.execute(WAREHOUSE_SCHEMA[table].format(name=name))
+
+def create_table_for_frame(conn, table, df, temp=False):
+    """CREATE TABLE dengan kolom & tipe sesuai dtype DataFrame"""
+    cols = ', '.join(f'"{col}" {sqlite_type(dtype)}' for col, dtype in df.dtypes.items())
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(f"CREATE {'TEMP ' if temp else ''}TABLE {table} ({cols})")
+
+def frame_rows(df):
+    """Baris DataFrame sebagai tuple tipe Python (NaN/NaT -> None, tanggal -> 'YYYY-MM-DD')"""
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime('%Y-%m-%d')
+        columns.append(series.astype(object).where(series.notna(), None).tolist())
+    return zip(*columns)
+
+def insert_frame(conn, table, df):
+    """INSERT semua baris df ke table dengan executemany per SQL_BATCH_SIZE baris"""
+    cols = ', '.join(f'"{col}"' for col in df.columns)
+    placeholders = ', '.join('?' * len(df.columns))
+    sql = f"INSERT INTO {table} ({cols}) VALUES ({placeholders})"
+    for start in range(0, len(df), SQL_BATCH_SIZE):
+        conn.executemany(sql, frame_rows(df.iloc[start:start + SQL_BATCH_SIZE]))
+
+def warehouse_schema_changed(conn):
+    """True jika kolom tabel live (nama, tipe, NOT NULL, primary key) berbeda dari
+    WAREHOUSE_SCHEMA (database versi lama)"""
+    expected = sqlite3.connect(':memory:')
+    try:
+        for table, ddl in WAREHOUSE_SCHEMA.items():
+            expected.execute(ddl.format(name=table))
+            columns = [tuple(row[1:]) for row in expected.execute(f"PRAGMA table_info({table})")]
+            if columns != [tuple(row[1:]) for row in conn.execute(f"PRAGMA table_info({table})")]:
+                return True
+        return False
+    finally:
+        expected.close()
+
+def swap_staging_tables(conn):
+    """Ganti tabel live dengan versi staging lalu buat index (dalam transaksi pemanggil).
+
+    Index dibuat setelah data masuk (lebih cepat daripada update index per baris)
+    dan setelah rename, karena nama index SQLite berlaku global per database.
+    """
+    for table in WAREHOUSE_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"ALTER TABLE {table}{STAGING_SUFFIX} RENAME TO {table}")
+    for ddl in WAREHOUSE_INDEXES:
+        conn.execute(ddl)
+
+# --- METADATA / WATERMARK ---
+def bump_warehouse_version(conn):
+    """Naikkan stempel versi warehouse (PRAGMA user_version) di transaksi load.
+
+    Dibaca app.py sebagai bagian key cache response: setiap load yang
+    commit otomatis membuat cache lama tidak terpakai lagi.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0] + 1
+    conn.execute(f"PRAGMA user_version = {version}")
+    return version
+
+def file_checksum(path):
+    """MD5 isi file, dibaca per blok 1 MB"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def ensure_etl_metadata(conn):
+    """Buat EtlMetadata; database lama (tanpa File_Size) ditambah kolomnya"""
+    conn.execute(ETL_METADATA_DDL)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(EtlMetadata)")]
+    if 'File_Size' not in columns:
+        conn.execute("ALTER TABLE EtlMetadata ADD COLUMN File_Size INTEGER")
+
+def read_watermarks(conn):
+    """Mengembalikan {Source: row metadata}; kosong jika belum pernah load"""
+    ensure_etl_metadata(conn)
+    rows = conn.execute("SELECT * FROM EtlMetadata").fetchall()
+    return {row['Source']: dict(row) for row in rows}
+
+def source_changed(path, watermark):
+    """Cek cepat via mtime, lalu checksum jika mtime berbeda"""
+    if watermark is None:
+        return True
+    if watermark['File_Mtime'] == os.path.getmtime(path):
+        return False
+    return watermark['Checksum'] != file_checksum(path)
+
+def source_appended(path, watermark):
+    """True jika file hanya bertambah baris di akhir sejak load terakhir.
+
+    File_Size byte pertama harus sama persis dengan isi file saat itu
+    (checksum-nya = Checksum lama) dan diakhiri newline. Jika tidak, ada baris
+    lama yang diubah/dihapus dan watermark tidak bisa dipakai.
+    """
+    size = watermark.get('File_Size')
+    if size is None or os.path.getsize(path) < size:
+        return False
+    digest = hashlib.md5()
+    last_byte = b''
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                return False
+            digest.update(block)
+            remaining -= len(block)
+            last_byte = block[-1:]
+    return digest.hexdigest() == watermark['Checksum'] and last_byte in (b'', b'\n')
+
+def appended_order_numbers(path, offset):
+    """Nomor order (kolom pertama) di baris yang ditambahkan setelah byte offset"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        tail = f.read()
+    if not tail.strip():
+        return set()
+    df = pd.read_csv(io.BytesIO(tail), header=None, usecols=[0], dtype=str, encoding='latin1')
+    return set(df[0].dropna())
+
+def save_watermark(conn, source, path, row_count, last_order_date=None, last_order_number=None):
+    conn.execute("""
+        INSERT OR REPLACE INTO EtlMetadata
+            (Source, Checksum, File_Size, File_Mtime, Row_Count, Last_Order_Date, Last_Order_Number, Loaded_At)
+        VALUES (:source, :checksum, :size, :mtime, :row_count, :last_date, :last_number, :loaded_at)
+    """, {
+        'source': source, 'checksum': file_checksum(path), 'size': os.path.getsize(path),
+        'mtime': os.path.getmtime(path),
+        'row_count': int(row_count), 'last_date': last_order_date, 'last_number': last_order_number,
+        'loaded_at': datetime.now().isoformat(timespec='seconds'),
+    })
+
+def save_sales_watermark(conn, path):
+    """Watermark sales = Order_Date & Order_Number terbesar yang sudah ada di FactSales"""
+    row = conn.execute("""
+        SELECT COUNT(*) AS n, MAX(Order_Date) AS last_date,
+               (SELECT Order_Number FROM FactSales
+                ORDER BY CAST(SUBSTR(Order_Number, 3) AS INTEGER) DESC LIMIT 1) AS last_number
+        FROM FactSales
+    """).fetchone()
+    save_watermark(conn, SALES_SOURCE, path, row['n'], row['last_date'], row['last_number'])
+
+def order_number_seq(order_numbers):
+    """'SO43697' -> 43697 (urutan numerik nomor order)"""
+    return pd.to_numeric(order_numbers.astype(str).str.extract(r'(\d+)$')[0], errors='coerce')
+
+# --- EXTRACT ---
+def read_sales_csv(path):
+    """Membaca sales_details.csv sesuai SALES_DTYPES.
+
+    Jika ada nilai non-numerik di kolom angka (file kotor), baca ulang sebagai
+    teks lalu konversi per kolom dengan errors='coerce' (nilai rusak -> NaN).
+    """
+    try:
+        df = pd.read_csv(path, dtype=SALES_READ_DTYPES, encoding='latin1')
+        df['sls_cust_id'] = text_to_int(df['sls_cust_id'], SALES_DTYPES['sls_cust_id'])
+        return df
+    except (ValueError, TypeError) as e:
+        print(f"   [WARNING] Parsing bertipe gagal ({e}), membaca ulang sebagai teks...")
+        df = pd.read_csv(path, dtype=str, encoding='latin1')
+        return coerce_sales_types(df)
+
+def text_to_float(values):
+    """Teks -> float64: astype (cepat) dulu, to_numeric(errors='coerce') hanya jika ada nilai rusak"""
+    try:
+        return values.astype('float64')
+    except (ValueError, TypeError):
+        return pd.to_numeric(values, errors='coerce')
+
+def text_to_int(values, dtype):
+    """Teks -> integer nullable (misal 'Int32'); bukan bilangan bulat atau di luar range -> <NA>"""
+    numbers = text_to_float(values)
+    info = np.iinfo(dtype.lower())
+    valid = (numbers % 1 == 0) & numbers.between(info.min, info.max)
+    return numbers.where(valid).astype(dtype)
+
+def coerce_sales_types(df):
+    """Konversi kolom teks ke tipe di SALES_DTYPES; nilai yang tidak valid jadi NaN"""
+    for col, dtype in SALES_DTYPES.items():
+        if dtype == 'Int32':
+            df[col] = text_to_int(df[col], dtype)
+        elif dtype == 'float64':
+            df[col] = text_to_float(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def iter_sales_chunks(path, chunksize, timer):
+    """Generator DataFrame sales per chunk (chunksize=None -> satu DataFrame utuh).
+
+    Waktu baca dicatat ke stage 'extract'. File dibaca satu kali dengan
+    SALES_CHUNK_DTYPES; tiap chunk dikonversi vektor oleh coerce_sales_types,
+    jadi chunk dengan nilai non-numerik cukup menjadi NaN tanpa baca ulang.
+    """
+    if not chunksize:
+        with timer.stage('extract'):
+            df_sales = read_sales_csv(path)
+        yield df_sales
+        return
+
+    with pd.read_csv(path, dtype=SALES_CHUNK_DTYPES, encoding='latin1', chunksize=chunksize) as reader:
+        while True:
+            with timer.stage('extract'):
+                chunk = next(reader, None)
+                if chunk is not None:
+                    chunk = coerce_sales_types(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+def extract_crm_customers(path):
+    """cust_info.csv: trim nama, normalisasi kode, satu baris per cst_id (record terbaru)"""
+    df = pd.read_csv(path, encoding='latin1')
+    # Customer_ID adalah PRIMARY KEY: buang baris tanpa ID dan ambil record
+    # terbaru (cst_create_date) untuk ID yang dobel
+    df = (df.dropna(subset=['cst_id'])
+          .sort_values('cst_create_date')
+          .drop_duplicates('cst_id', keep='last')
+          .sort_values('cst_id'))
+    return pd.DataFrame({
+        'Customer_ID': df['cst_id'].astype(int),
+        'Customer_Key': df['cst_key'].str.strip(),
+        'First_Name': df['cst_firstname'].str.strip(),
+        'Last_Name': df['cst_lastname'].str.strip(),
+        'Marital_Status': df['cst_marital_status'].str.strip().str.upper().map(MARITAL_STATUS_MAP).fillna('n/a'),
+        'Gender': df['cst_gndr'].str.strip().str.upper().map(GENDER_MAP).fillna('n/a'),
+        'Create_Date': pd.to_datetime(df['cst_create_date'], errors='coerce'),
+    })
+
+def extract_crm_products(path):
+    """prd_info.csv -> DimProduct dasar (lihat build_dim_product)"""
+    return build_dim_product(pd.read_csv(path, encoding='latin1'))
+
+def extract_crm_sales(path):
+    return read_sales_csv(path)
+
+def extract_erp_customers(path):
+    """CUST_AZ12.csv: CID 'NASAW00011000' -> cst_key 'AW00011000', birthdate & gender"""
+    df = pd.read_csv(path, encoding='latin1', dtype=str)
+    birthdate = pd.to_datetime(df['BDATE'], errors='coerce')
+    # Tanggal lahir di masa depan dianggap tidak valid
+    birthdate = birthdate.where(birthdate <= pd.Timestamp.now())
+    return pd.DataFrame({
+        'Customer_Key': df['CID'].str.strip().str.replace(r'^NAS', '', regex=True),
+        'Birthdate': birthdate,
+        'ERP_Gender': df['GEN'].str.strip().str.upper().map(GENDER_MAP),
+    }).drop_duplicates('Customer_Key')
+
+def extract_erp_locations(path):
+    """LOC_A101.csv: CID 'AW-00011000' -> cst_key 'AW00011000', nama negara dinormalisasi"""
+    df = pd.read_csv(path, encoding='latin1', dtype=str)
+    country = df['CNTRY'].str.strip()
+    country = country.replace(COUNTRY_MAP).replace('', pd.NA).fillna('n/a')
+    return pd.DataFrame({
+        'Customer_Key': df['CID'].str.strip().str.replace('-', '', regex=False),
+        'Country': country,
+    }).drop_duplicates('Customer_Key')
+
+def extract_erp_categories(path):
+    """PX_CAT_G1V2.csv: ID (misal 'AC_BR') = Category_ID di DimProduct"""
+    df = pd.read_csv(path, encoding='latin1', dtype=str)
+    return pd.DataFrame({
+        'Category_ID': df['ID'].str.strip(),
+        'Category': df['CAT'].str.strip(),
+        'Subcategory': df['SUBCAT'].str.strip(),
+        'Maintenance': df['MAINTENANCE'].str.strip(),
+    })
+
+SOURCE_EXTRACTORS = {
+    'crm_sales': extract_crm_sales,
+    'crm_customers': extract_crm_customers,
+    'crm_products': extract_crm_products,
+    'erp_customers': extract_erp_customers,
+    'erp_locations': extract_erp_locations,
+    'erp_categories': extract_erp_categories,
+}
+
+def extract_source(name, path):
+    """Dijalankan di worker process: baca + bersihkan satu file sumber"""
+    start = time.perf_counter()
+    df = SOURCE_EXTRACTORS[name](path)
+    return name, df, time.perf_counter() - start
+
+def extract_sources(base_dir, names, workers, timer):
+    """Extract beberapa sumber sekaligus di ProcessPoolExecutor.
+
+    workers=None -> satu proses per sumber (maks. jumlah core), workers=1 ->
+    serial di proses ini. Mengembalikan {nama sumber: DataFrame}.
+    """
+    paths = {name: os.path.join(base_dir, SOURCE_FILES[name]) for name in names}
+    if workers is None:
+        workers = min(len(paths), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    with timer.stage('extract'):
+        if workers <= 1:
+            results = [extract_source(name, path) for name, path in paths.items()]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(extract_source, name, path) for name, path in paths.items()]
+                results = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+
+    extracted = {}
+    for name, df, seconds in results:
+        extracted[name] = df
+        timer.sources[name] = seconds
+        print(f"   [OK] {SOURCE_FILES[name]:<30} {len(df):>8} baris  {seconds:6.3f} s")
+    serial = sum(timer.sources[name] for name in names)
+    print(f"   [INFO] {len(paths)} sumber, {workers} worker: wall-clock {wall:.3f} s "
+          f"vs total per sumber {serial:.3f} s (speed-up {serial / wall if wall else 0:.1f}x)")
+    return extracted
+
+# --- TRANSFORM ---
+def parse_sales_dates(df_sales):
+    """Tanggal 20140128 -> datetime, vektor (format tetap, nilai aneh -> NaT)"""
+    for col in SALES_DATE_COLUMNS:
+        df_sales[col] = pd.to_datetime(df_sales[col].str.strip(), format=SALES_DATE_FORMAT, errors='coerce')
+    return df_sales
+
+def fix_sales_numbers(df_sales):
+    """Sales & quantity kosong dianggap 0 (perilaku awal), lalu downcast"""
+    df_sales['sls_sales'] = df_sales['sls_sales'].fillna(0)
+    df_sales['sls_quantity'] = df_sales['sls_quantity'].fillna(0).astype('int32')
+    return df_sales
+
+def rename_sales_columns(df_sales):
+    return df_sales.rename(columns={
         'sls_ord_num': 'Order_Number', 
         'sls_prd_key': 'Product_Key', 
         'sls_cust_id': 'Customer_ID',
         'sls_order_dt': 'Order_Date', 
+        'sls_ship_dt': 'Ship_Date',
+        'sls_due_dt': 'Due_Date',
         'sls_sales': 'Sales_Amount',
         'sls_quantity': 'Quantity',
         'sls_price': 'Unit_Price'
     })
 
-    # Cek jumlah baris setelah transform
-    print(f"   [INFO] Jumlah baris siap load: {len(fact_sales)}")
-    if len(fact_sales) == 0:
-        print("!!! ERROR: Data hilang saat transformasi! Cek format CSV Anda.")
-        exit()
-
-    # D. TRANSFORM PRODUCT & CUSTOMER (Sederhana)
-    # Product
-    df_prd_crm['prd_key'] = df_prd_crm['prd_key'].astype(str).str.strip().str.upper()
-    dim_product = df_prd_crm.rename(columns={
-        'prd_id': 'Product_ID', 'prd_key': 'Product_Key', 'prd_nm': 'Product_Name',
-        'prd_cost': 'Product_Cost', 'prd_line': 'Product_Line'
-    })
+def transform_sales(df_sales, timer):
+    """Membersihkan tanggal & angka sales lalu rename kolom ke skema FactSales"""
+    # A. FIX FORMAT TANGGAL (Penyebab utama data 0)
+    with timer.stage('transform_dates'):
+        df_sales = parse_sales_dates(df_sales)
+
+    # B. FIX ANGKA (Sales Amount)
+    with timer.stage('transform_numeric'):
+        df_sales = fix_sales_numbers(df_sales)
+
+    # C. RENAME KOLOM + kolom tahun/bulan untuk filter ber-index
+    fact_sales = rename_sales_columns(df_sales)
+    fact_sales['Order_Year'] = fact_sales['Order_Date'].dt.year.astype('Int16')
+    fact_sales['Order_Month'] = fact_sales['Order_Date'].dt.month.astype('Int8')
+    return fact_sales
+
+def build_dim_customer(crm_customers, erp_customers, erp_locations):
+    """DimCustomer = CRM (master) + tanggal lahir/gender ERP + negara ERP via Customer_Key"""
+    dim_customer = (crm_customers
+                    .merge(erp_customers, on='Customer_Key', how='left')
+                    .merge(erp_locations, on='Customer_Key', how='left'))
+    # Gender CRM adalah master; ERP hanya mengisi yang kosong
+    missing_gender = dim_customer['Gender'] == 'n/a'
+    dim_customer.loc[missing_gender, 'Gender'] = dim_customer.loc[missing_gender, 'ERP_Gender']
+    dim_customer['Gender'] = dim_customer['Gender'].fillna('n/a')
+    dim_customer['Country'] = dim_customer['Country'].fillna('n/a')
+    # Nama lengkap disimpan (bukan dihitung per query) supaya sort & prefix search pakai index
+    dim_customer['Full_Name'] = (dim_customer['First_Name'].fillna('') + ' '
+                                 + dim_customer['Last_Name'].fillna('')).str.strip()
+    return dim_customer[['Customer_ID', 'Customer_Key', 'First_Name', 'Last_Name', 'Full_Name',
+                         'Marital_Status', 'Gender', 'Birthdate', 'Country', 'Create_Date']]
+
+def align_product_sk(dim_product, conn):
+    """Mode incremental: Product_SK lama dipertahankan, versi produk baru dapat SK baru"""
+    existing = pd.read_sql("SELECT Product_ID, Product_SK FROM DimProduct", conn)
+    mapping = dict(zip(existing['Product_ID'], existing['Product_SK']))
+    product_sk = dim_product['Product_ID'].map(mapping)
+    missing = product_sk.isna()
+    next_sk = int(max(mapping.values(), default=0)) + 1
+    product_sk[missing] = range(next_sk, next_sk + missing.sum())
+    dim_product['Product_SK'] = product_sk.astype(int)
+    return dim_product
+
+def changed_product_keys(conn, dim_product):
+    """Mode incremental: Product_Key yang versi/rentang berlakunya berbeda dari DimProduct.
+
+    Versi baru menggeser End_Date versi sebelumnya, jadi order lama produk
+    tersebut bisa pindah ke versi lain (lihat realign_fact_product_sk).
+    """
+    columns = ['Product_SK', 'Product_Key', 'Start_Date', 'End_Date']
+    existing = pd.read_sql(f"SELECT {', '.join(columns)} FROM DimProduct", conn)
+    incoming = dim_product[columns].copy()
+    for col in ('Start_Date', 'End_Date'):
+        incoming[col] = incoming[col].dt.strftime('%Y-%m-%d')
+    old = set(map(tuple, existing.fillna('').astype(str).to_numpy()))
+    new = set(map(tuple, incoming.fillna('').astype(str).to_numpy()))
+    return {version[1] for version in old ^ new}
+
+def realign_fact_product_sk(conn, product_keys, lookup):
+    """Hitung ulang Product_SK FactSales yang sudah dimuat untuk product_keys.
+
+    Memakai resolve_product_sk yang sama dengan full load, jadi hasilnya
+    identik dengan rebuild penuh. Mengembalikan jumlah baris yang pindah versi.
+    """
+    if not product_keys:
+        return 0
+    keys = pd.DataFrame({'Product_Key': sorted(product_keys)})
+    create_table_for_frame(conn, 'Product_touched', keys, temp=True)
+    insert_frame(conn, 'Product_touched', keys)
+    facts = pd.read_sql("""
+        SELECT rowid AS Fact_Rowid, Product_Key, Order_Date, Product_SK FROM FactSales
+        WHERE Product_Key IN (SELECT Product_Key FROM Product_touched)
+    """, conn)
+    conn.execute("DROP TABLE Product_touched")
+    facts['Order_Date'] = pd.to_datetime(facts['Order_Date'], errors='coerce')
+    product_sk = resolve_product_sk(facts, lookup)
+    moved = product_sk.fillna(-1).to_numpy() != facts['Product_SK'].fillna(-1).to_numpy()
+    updates = zip([None if pd.isna(sk) else int(sk) for sk in product_sk[moved]],
+                  facts.loc[moved, 'Fact_Rowid'].tolist())
+    conn.executemany("UPDATE FactSales SET Product_SK = ? WHERE rowid = ?", updates)
+    return int(moved.sum())
+
+# --- LOAD ---
+def upsert_rows(conn, df, table, key):
+    """DELETE baris lama dengan key yang sama lalu INSERT baris baru (dalam transaksi conn)"""
+    incoming = f"{table}_incoming"
+    create_table_for_frame(conn, incoming, df, temp=True)
+    insert_frame(conn, incoming, df)
+    cols = ', '.join(df.columns)
+    conn.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {incoming})")
+    conn.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {incoming}")
+    conn.execute(f"DROP TABLE {incoming}")
+
+def load_dimensions_full(conn, dim_product, dim_customer, timer):
+    with timer.stage('load'):
+        for table, df in (('DimProduct', dim_product), ('DimCustomer', dim_customer)):
+            create_warehouse_table(conn, table, table + STAGING_SUFFIX)
+            insert_frame(conn, table + STAGING_SUFFIX, df)
+
+def load_fact_chunk(conn, fact_chunk, first_chunk, timer):
+    """Menulis satu chunk FactSales ke tabel staging (chunk pertama membuat tabelnya)"""
+    with timer.stage('load'):
+        if first_chunk:
+            create_warehouse_table(conn, 'FactSales', 'FactSales' + STAGING_SUFFIX)
+        insert_frame(conn, 'FactSales' + STAGING_SUFFIX, fact_chunk[FACT_COLUMNS])
+
+def finalize_full_load(conn, timer):
+    """Swap staging -> live, buat index, bangun ulang agregat (masih di transaksi yang sama)"""
+    with timer.stage('load'):
+        swap_staging_tables(conn)
+    print("   [SUKSES] Tabel berhasil dibuat.")
+
+    # --- 3b. AGREGAT ---
+    print("\n-> Membangun tabel agregat...")
+    with timer.stage('aggregates'):
+        build_aggregates(conn)
+    print(f"   [SUKSES] Agregat dibuat: {', '.join(AGGREGATE_TABLES)}")
+
+def load_incremental(conn, new_sales, dim_product, dim_customer, product_lookup):
+    """Upsert baris baru ke tabel yang sudah ada + refresh agregat yang tersentuh.
+
+    Dipanggil di dalam bulk_transaction(), jadi dashboard tidak pernah
+    melihat tabel kosong/setengah jadi.
+    """
+    touched = {'Order_Year': set(), 'Product_Name': set()}
+
+    if dim_customer is not None:
+        upsert_rows(conn, dim_customer, 'DimCustomer', 'Customer_ID')
+        print(f"   [OK] DimCustomer di-upsert: {len(dim_customer)} baris")
+
+    if dim_product is not None:
+        # Nama/line produk bisa berubah -> semua agregat produk dihitung ulang
+        # (nama lama ikut di-scope supaya barisnya terhapus dari agregat)
+        product_names = "SELECT Product_Name FROM DimProduct WHERE Is_Current = 1"
+        touched['Product_Name'].update(row[0] for row in conn.execute(product_names))
+        product_keys = changed_product_keys(conn, dim_product)
+        upsert_rows(conn, dim_product, 'DimProduct', 'Product_SK')
+        touched['Product_Name'].update(row[0] for row in conn.execute(product_names))
+        touched['Order_Year'].update(
+            row[0] for row in conn.execute("SELECT DISTINCT Order_Year FROM AggProductYearly"))
+        print(f"   [OK] DimProduct di-upsert: {len(dim_product)} baris")
+        # Order lama ikut dipindah ke versi yang berlaku pada Order_Date-nya
+        moved = realign_fact_product_sk(conn, product_keys, product_lookup)
+        print(f"   [OK] Product_SK FactSales diselaraskan ulang untuk {len(product_keys)} produk: "
+              f"{moved} baris pindah versi")
+
+    if new_sales is not None and len(new_sales) > 0:
+        # Order yang dimuat ulang bisa sudah ada (misal baris susulan untuk order terakhir)
+        create_table_for_frame(conn, 'FactSales_touched', new_sales[['Order_Number', 'Product_SK']], temp=True)
+        insert_frame(conn, 'FactSales_touched', new_sales[['Order_Number', 'Product_SK']])
+        touched['Order_Year'].update(row[0] for row in conn.execute("""
+            SELECT DISTINCT Order_Year FROM FactSales
+            WHERE Order_Number IN (SELECT Order_Number FROM FactSales_touched)
+        """))
+        touched['Order_Year'].update(int(y) for y in new_sales['Order_Year'].dropna().unique())
+        if new_sales['Order_Year'].isna().any():
+            touched['Order_Year'].add(None)
+        # Agregat produk memakai nama versi aktif (SCD) dari Product_Key yang tersentuh
+        touched['Product_Name'].update(row[0] for row in conn.execute("""
+            SELECT c.Product_Name FROM DimProduct p
+            JOIN DimProduct c ON c.Product_Key = p.Product_Key AND c.Is_Current = 1
+            WHERE p.Product_SK IN (
+                SELECT Product_SK FROM FactSales
+                WHERE Order_Number IN (SELECT Order_Number FROM FactSales_touched)
+                UNION
+                SELECT Product_SK FROM FactSales_touched)
+        """))
+        conn.execute("DROP TABLE FactSales_touched")
+        upsert_rows(conn, new_sales[FACT_COLUMNS], 'FactSales', 'Order_Number')
+        print(f"   [OK] FactSales: {len(new_sales)} baris baru/berubah dimuat")
 
-    # Customer (Simple Load)
-    dim_customer = df_cust_crm[['cst_id', 'cst_key', 'cst_firstname', 'cst_lastname', 'cst_gndr']].copy()
-    dim_customer.columns = ['Customer_ID', 'Customer_Key', 'First_Name', 'Last_Name', 'Gender']
+    refresh_aggregates(conn, touched)
+    print(f"   [OK] Agregat di-refresh untuk tahun: {sorted(y for y in touched['Order_Year'] if y)}")
 
-    # --- 3. LOAD ---
-    print("\n-> Loading ke Database SQLite...")
+def reset_quarantine(conn, full):
+    """Full load: quarantine dikosongkan (dibuat ulang). Tabel dibuat jika belum ada."""
+    if full:
+        conn.execute(f"DROP TABLE IF EXISTS {data_quality.QUARANTINE_TABLE}")
+    conn.execute(data_quality.QUARANTINE_DDL)
+    conn.execute(data_quality.QUARANTINE_INDEX)
+
+def clear_quarantined_orders(conn, order_numbers):
+    """Mode incremental: order yang dimuat ulang dihapus dari quarantine lama"""
+    orders = pd.DataFrame({'Order_Number': order_numbers.unique()})
+    create_table_for_frame(conn, 'Quarantine_touched', orders, temp=True)
+    insert_frame(conn, 'Quarantine_touched', orders)
+    conn.execute(f"DELETE FROM {data_quality.QUARANTINE_TABLE} "
+                 "WHERE Order_Number IN (SELECT Order_Number FROM Quarantine_touched)")
+    conn.execute("DROP TABLE Quarantine_touched")
+
+def peak_memory_mb():
+    """Peak RSS proses ini (MB); None jika modul resource tidak tersedia (Windows)"""
     try:
-        fact_sales.to_sql('FactSales', engine, if_exists='replace', index=False)
-        dim_product.to_sql('DimProduct', engine, if_exists='replace', index=False)
-        dim_customer.to_sql('DimCustomer', engine, if_exists='replace', index=False)
-        print("   [SUKSES] Tabel berhasil dibuat.")
-    except Exception as e:
-        print(f"!!! Gagal Load ke DB: {e}")
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+def write_api_snapshots(timer, version):
+    """Render snapshot API lewat app.py dari warehouse yang sudah commit.
+
+    app di-import di sini supaya ETL tidak butuh Flask kalau snapshot tidak dipakai.
+    """
+    print("\n-> Menulis snapshot API...")
+    with timer.stage('snapshots'):
+        from app import app as flask_app
+        count = api_snapshots.write_snapshots(flask_app, version)
+    print(f"   [OK] {count} snapshot ditulis ke {api_snapshots.DEFAULT_SNAPSHOT_DIR}")
+
+def run_etl(mode='full', chunksize=None, workers=None, parquet=False, snapshots=False, validate=True,
+            base_dir=None):
+    """Menjalankan ETL.
+
+    mode='full'        : rebuild semua tabel dari CSV (perilaku awal)
+    mode='incremental' : hanya memuat file yang berubah sejak load terakhir,
+                         baris sales baru (di atas watermark) + upsert dimensi;
+                         jika baris lama sales_details.csv diubah/dihapus
+                         (bukan sekadar ditambah), beralih ke full load
+    chunksize          : jika diisi, sales_details.csv dibaca & ditulis per
+                         chunk sehingga memori tidak tumbuh mengikuti ukuran file
+    workers            : jumlah proses untuk extract paralel (None = otomatis,
+                         1 = serial)
+    parquet            : jika True, tulis juga store kolomnar Parquet (partisi
+                         per tahun order) untuk backend dashboard 'parquet';
+                         jika False, store lama dihapus supaya tidak basi
+    snapshots          : jika True, render response API yang umum (tahun,
+                         dashboard per tahun, halaman pertama list) ke file
+                         .json.gz + ETag yang dilayani app.py tanpa query DB;
+                         jika False, snapshot lama dihapus supaya tidak basi
+    validate           : jika True (default), baris sales yang melanggar aturan
+                         data_quality.VALIDATION_RULES tidak dimuat ke FactSales
+                         melainkan ke QuarantineSales dengan kode alasannya
+    base_dir           : folder yang berisi source_crm/ & source_erp/
+                         (None = dicari otomatis dari folder script)
+
+    Mengembalikan dict {nama stage: detik} (lihat StageTimer).
+    """
+    print(f"\n=== MEMULAI PROSES ETL (VERSI DIAGNOSIS, mode={mode}, chunksize={chunksize}) ===")
+    timer = StageTimer()
+    BASE_DIR = base_dir or find_data_directory()
+    
+    # --- 1. EXTRACT ---
+    source_paths = {name: os.path.join(BASE_DIR, rel) for name, rel in SOURCE_FILES.items()}
+    sales_path = source_paths['crm_sales']
+
+    conn = connect_warehouse()
+    watermarks = {}
+    if mode == 'incremental':
+        watermarks = read_watermarks(conn)
+        has_fact = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='FactSales'").fetchone()
+        if SALES_SOURCE not in watermarks or not has_fact:
+            print("   [INFO] Belum ada watermark / FactSales, beralih ke full load.")
+            mode = 'full'
+        elif warehouse_schema_changed(conn):
+            print("   [INFO] Skema tabel warehouse berubah, beralih ke full load.")
+            mode = 'full'
+
+    if mode == 'incremental':
+        changed = {name: source_changed(path, watermarks.get(SOURCE_FILES[name]))
+                   for name, path in source_paths.items()}
+        sales_changed = changed['crm_sales']
+        if sales_changed and not source_appended(sales_path, watermarks[SALES_SOURCE]):
+            # Koreksi/penghapusan baris lama tidak tertangkap watermark
+            if watermarks[SALES_SOURCE].get('File_Size') is None:
+                print("   [INFO] Watermark sales belum mencatat ukuran file, beralih ke full load.")
+            else:
+                print("   [INFO] sales_details.csv tidak hanya bertambah baris (baris lama diubah/dihapus), "
+                      "beralih ke full load.")
+            mode = 'full'
+
+    if mode == 'incremental':
+        cust_changed = any(changed[name] for name in CUSTOMER_SOURCES)
+        prd_changed = any(changed[name] for name in PRODUCT_SOURCES)
+        print(f"   [INFO] Berubah -> sales: {sales_changed}, customer: {cust_changed}, product: {prd_changed}")
+        if not (sales_changed or cust_changed or prd_changed):
+            print(">>> Tidak ada perubahan di file sumber. Tidak ada yang dimuat.")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            conn.close()
+            # Snapshot tetap ditulis jika belum ada / dari versi warehouse lain
+            if snapshots and api_snapshots.snapshot_version() != version:
+                write_api_snapshots(timer, version)
+            return timer.durations
+    
+    # Debug print
+    debug_print_file_head(sales_path)
+
+    # Semua sumber CRM & ERP di-extract paralel. Sales ikut di pool kecuali
+    # mode streaming (chunksize), di mana sales dibaca per chunk di proses utama.
+    print("\n-> Extract sumber CRM & ERP (paralel)...")
+    names = CUSTOMER_SOURCES + PRODUCT_SOURCES
+    read_sales_in_pool = not chunksize and (mode == 'full' or sales_changed)
+    if read_sales_in_pool:
+        names = ['crm_sales'] + names
+    extracted = extract_sources(BASE_DIR, names, workers, timer)
+
+    # D. TRANSFORM PRODUCT & CUSTOMER
+    # Dimensi dibangun dulu karena lookup Product_SK dibutuhkan tiap chunk sales
+    # Product: prd_key = kode kategori (5 char) + '-' + key yang dipakai di sales
+    dim_product = enrich_dim_product(extracted['crm_products'], extracted['erp_categories'])
+    dim_customer = build_dim_customer(extracted['crm_customers'], extracted['erp_customers'],
+                                      extracted['erp_locations'])
+
+    if mode == 'incremental':
+        dim_product = align_product_sk(dim_product, conn)
+        wm = watermarks[SALES_SOURCE]
+        last_seq = order_number_seq(pd.Series([wm['Last_Order_Number']])).iloc[0]
+        last_date = pd.to_datetime(wm['Last_Order_Date'])
+        # Baris tambahan untuk order lama (di bawah watermark) ikut dimuat bersama
+        # baris order tersebut yang sudah ada (upsert per Order_Number)
+        appended_orders = appended_order_numbers(sales_path, wm['File_Size']) if sales_changed else set()
+
+    # Indeks as-of versi produk (SCD) untuk lookup Product_SK di setiap chunk
+    with timer.stage('product_lookup'):
+        product_lookup = build_product_lookup(dim_product)
+
+    # Validasi vektor per chunk (lihat data_quality.py)
+    validator = data_quality.SalesValidator(dim_customer['Customer_ID']) if validate else None
+
+    # Seluruh load berjalan dalam SATU transaksi: full load menulis ke tabel
+    # staging lalu swap di akhir, jadi pembaca hanya melihat data lama atau
+    # data baru yang lengkap (tidak pernah tabel hilang/setengah jadi).
+    with bulk_transaction(conn):
+        if mode == 'full':
+            print("\n-> Loading dimensi ke tabel staging...")
+            load_dimensions_full(conn, dim_product, dim_customer, timer)
+        reset_quarantine(conn, full=(mode == 'full'))
+        loaded_at = datetime.now().isoformat(timespec='seconds')
+
+        # --- 2. TRANSFORM + 3. LOAD SALES (per chunk) ---
+        print("\n-> Membaca, transformasi & load sales...")
+        total_rows = 0
+        unmatched = 0
+        new_sales_parts = []
+        if read_sales_in_pool:
+            sales_chunks = [extracted.pop('crm_sales')]
+        else:
+            sales_chunks = iter_sales_chunks(sales_path, chunksize, timer)
+        if mode == 'incremental' and not sales_changed:
+            sales_chunks = []
+
+        for chunk_no, df_sales in enumerate(sales_chunks):
+            first_row = total_rows
+            total_rows += len(df_sales)
+            # Nilai mentah disimpan dulu: transform mengisi NaN & mem-parse tanggal
+            raw_sales = data_quality.raw_sales_values(df_sales) if validator else None
+            fact_sales = transform_sales(df_sales, timer)
+
+            if mode == 'incremental':
+                # Baris baru = nomor order >= watermark (termasuk baris susulan order terakhir),
+                # tanggal order setelah watermark, atau order yang muncul di baris tambahan
+                is_new = ((order_number_seq(fact_sales['Order_Number']) >= last_seq)
+                          | (fact_sales['Order_Date'] > last_date)
+                          | fact_sales['Order_Number'].isin(appended_orders))
+                fact_sales = fact_sales[is_new].copy()
+
+            # Resolusi Product_SK dilakukan SEKALI di sini, bukan di setiap query dashboard
+            with timer.stage('product_lookup'):
+                fact_sales['Product_SK'] = resolve_product_sk(fact_sales, product_lookup)
+            unmatched += fact_sales['Product_SK'].isna().sum()
+
+            if validator is not None:
+                if mode == 'incremental' and len(fact_sales):
+                    clear_quarantined_orders(conn, fact_sales['Order_Number'])
+                with timer.stage('validate'):
+                    fact_sales, rejects = validator.validate(fact_sales, raw_sales, first_row)
+                if rejects is not None:
+                    with timer.stage('load'):
+                        insert_frame(conn, data_quality.QUARANTINE_TABLE, rejects.assign(Loaded_At=loaded_at))
+
+            if mode == 'incremental':
+                new_sales_parts.append(fact_sales)
+            else:
+                load_fact_chunk(conn, fact_sales, chunk_no == 0, timer)
+            if chunksize:
+                print(f"   ...chunk {chunk_no + 1}: {total_rows} baris diproses")
+
+        # Cek jumlah baris setelah transform
+        print(f"   [INFO] Jumlah baris sales diproses: {total_rows}")
+        if unmatched:
+            print(f"   [WARNING] {unmatched} baris sales tidak menemukan produk di DimProduct")
+        if validator is not None:
+            validator.report()
+        if total_rows == 0 and (mode == 'full' or sales_changed):
+            print("!!! ERROR: Data hilang saat transformasi! Cek format CSV Anda.")
+            exit()
+
+        if mode == 'incremental':
+            new_sales = pd.concat(new_sales_parts, ignore_index=True) if new_sales_parts else None
+            if new_sales is not None:
+                print(f"   [INFO] Baris di atas watermark ({wm['Last_Order_Number']}, {wm['Last_Order_Date']}): {len(new_sales)}")
+            print("\n-> Loading incremental ke Database SQLite...")
+            with timer.stage('load'):
+                load_incremental(conn,
+                                 new_sales,
+                                 dim_product if prd_changed else None,
+                                 dim_customer if cust_changed else None,
+                                 product_lookup)
+        else:
+            print("\n-> Swap tabel staging ke tabel live...")
+            finalize_full_load(conn, timer)
+
+        # Simpan watermark baru untuk run incremental berikutnya
+        ensure_etl_metadata(conn)
+        save_sales_watermark(conn, sales_path)
+        for name in CUSTOMER_SOURCES + PRODUCT_SOURCES:
+            save_watermark(conn, SOURCE_FILES[name], source_paths[name], len(extracted[name]))
+        version = bump_warehouse_version(conn)
+    print(f"   [INFO] Versi warehouse sekarang: {version}")
+
+    # --- 3c. STORE PARQUET (OPSIONAL) ---
+    # Ditulis ulang penuh dari warehouse yang sudah commit (juga setelah incremental)
+    if parquet:
+        if not parquet_store.pyarrow_available():
+            print("   [WARNING] pyarrow tidak terpasang, store Parquet dilewati (pip install pyarrow).")
+        else:
+            print("\n-> Menulis store Parquet...")
+            with timer.stage('parquet_export'):
+                rows = parquet_store.export_parquet_store(conn)
+            print(f"   [OK] {rows} baris FactSales ditulis ke {parquet_store.DEFAULT_STORE_DIR}")
+    elif parquet_store.clear_store():
+        print("   [INFO] Store Parquet lama dihapus (jalankan dengan --parquet untuk menulis ulang).")
+    conn.close()
+
+    # --- 3d. SNAPSHOT API (OPSIONAL) ---
+    if snapshots:
+        write_api_snapshots(timer, version)
+    elif api_snapshots.clear_snapshots():
+        print("   [INFO] Snapshot API lama dihapus (jalankan dengan --snapshots untuk menulis ulang).")
 
     # --- 4. VERIFIKASI AKHIR ---
     print("\n=== VERIFIKASI HASIL ===")
-    with engine.connect() as conn:
+    with timer.stage('verify'), engine.connect() as conn:
         count = conn.execute(text("SELECT COUNT(*) FROM FactSales")).scalar()
         print(f"TOTAL DATA DI FactSales: {count} baris")
         
@@ -125,5 +1228,27 @@ def run_etl():
         else:
             print(">>> MASIH 0? Ada masalah aneh pada library pandas/sqlite Anda.")
 
+    timer.report()
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"   Peak RSS proses: {peak:.1f} MB")
+    return timer.durations
+
 if __name__ == "__main__":
-    run_etl()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ETL CSV CRM/ERP -> my_data_warehouse.db")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Hanya muat file/baris yang berubah sejak load terakhir (pakai watermark)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Proses sales_details.csv per N baris (streaming, memori tetap kecil)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Jumlah proses untuk extract paralel (default: otomatis, 1 = serial)")
+    parser.add_argument('--parquet', action='store_true',
+                        help="Tulis juga store Parquet per tahun untuk SALESREPORT_BACKEND=parquet")
+    parser.add_argument('--snapshots', action='store_true',
+                        help="Tulis snapshot JSON (gzip + ETag) untuk request API yang umum")
+    parser.add_argument('--no-validate', action='store_true',
+                        help="Lewati validasi data sales (semua baris dimuat, tanpa quarantine)")
+    args = parser.parse_args()
+    run_etl(mode='incremental' if args.incremental else 'full', chunksize=args.chunksize,
+            workers=args.workers, parquet=args.parquet, snapshots=args.snapshots,
+            validate=not args.no_validate)
\ No newline at end of file
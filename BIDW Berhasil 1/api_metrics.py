@@ -0,0 +1,172 @@
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+import re
+import sqlite3
+import threading
+import time
+
+# --- INSTRUMENTASI API (WAKTU REQUEST & QUERY SQL) ---
+# install(app, engine) memasang:
+#   - timer per request (before/after_request) -> header Server-Timing
+#   - timer per statement SQL (event cursor SQLAlchemy + cursor sqlite3 yang
+#     menghitung waktu fetch & jumlah baris) -> ikut di Server-Timing
+#   - histogram latency per route + statistik per query -> GET /api/metrics
+# Biaya per request: beberapa perf_counter() dan satu lock singkat.
+
+# Batas atas bucket histogram (ms); request di atas bucket terakhir masuk '+Inf'
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# Jumlah statement SQL yang dirinci di Server-Timing per request
+SERVER_TIMING_MAX_QUERIES = 10
+# Jumlah bentuk query berbeda yang disimpan di /api/metrics
+MAX_QUERY_SHAPES = 200
+
+_lock = threading.Lock()
+_started = time.time()
+_routes = {}
+_queries = {}
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor sqlite3 yang menambahkan waktu fetch & jumlah baris ke record query"""
+    timing = None
+
+    def _record(self, start, rows):
+        if self.timing is not None:
+            self.timing['ms'] += (time.perf_counter() - start) * 1000
+            self.timing['rows'] += rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record(start, row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._record(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record(start, len(rows))
+        return rows
+
+class TimedConnection(sqlite3.Connection):
+    """Pakai lewat create_engine(..., connect_args={'factory': TimedConnection})"""
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+def query_shape(statement):
+    """SQL dirapikan jadi satu baris pendek (label statistik per query)"""
+    return re.sub(r'\s+', ' ', statement).strip()[:120]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info['query_start'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop('query_start', None)
+    if start is None or not has_request_context():
+        return
+    record = {'sql': query_shape(statement), 'ms': (time.perf_counter() - start) * 1000,
+              'rows': max(cursor.rowcount, 0)}
+    # SELECT: baris dihitung & waktu fetch ditambahkan oleh TimedCursor
+    if isinstance(cursor, TimedCursor):
+        cursor.timing = record
+    g.setdefault('sql_timings', []).append(record)
+
+def _before_request():
+    g.request_start = time.perf_counter()
+    g.sql_timings = []
+
+def _after_request(response):
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    total_ms = (time.perf_counter() - start) * 1000
+    queries = g.get('sql_timings', [])
+    db_ms = sum(q['ms'] for q in queries)
+
+    # Server-Timing: total, db (semua query), lalu rincian tiap statement
+    parts = [f'total;dur={total_ms:.2f}',
+             f'db;dur={db_ms:.2f};desc="{len(queries)} query"']
+    cache = response.headers.get('X-Cache')
+    if cache:
+        parts.append(f'cache;desc="{cache}"')
+    for i, q in enumerate(queries[:SERVER_TIMING_MAX_QUERIES], 1):
+        desc = q['sql'][:60].replace('"', "'").replace('\\', '')
+        parts.append(f'sql{i};dur={q["ms"]:.2f};desc="{desc} ({q["rows"]} rows)"')
+    response.headers['Server-Timing'] = ', '.join(parts)
+
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    record_request(route, response.status_code, total_ms, queries)
+    return response
+
+def record_request(route, status, total_ms, queries):
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if total_ms <= bound),
+                  len(LATENCY_BUCKETS_MS))
+    with _lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = {'count': 0, 'errors': 0, 'sum_ms': 0.0, 'max_ms': 0.0,
+                                      'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+        stats['count'] += 1
+        stats['errors'] += status >= 500
+        stats['sum_ms'] += total_ms
+        stats['max_ms'] = max(stats['max_ms'], total_ms)
+        stats['buckets'][bucket] += 1
+
+        for q in queries:
+            qstats = _queries.get(q['sql'])
+            if qstats is None:
+                if len(_queries) >= MAX_QUERY_SHAPES:
+                    continue
+                qstats = _queries[q['sql']] = {'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            qstats['count'] += 1
+            qstats['sum_ms'] += q['ms']
+            qstats['max_ms'] = max(qstats['max_ms'], q['ms'])
+            qstats['rows'] += q['rows']
+
+def bucket_percentile(buckets, count, pct):
+    """Perkiraan persentil = batas atas bucket tempat persentil jatuh"""
+    target = count * pct / 100
+    seen = 0
+    for bound, n in zip(LATENCY_BUCKETS_MS + ('+Inf',), buckets):
+        seen += n
+        if n and seen >= target:
+            return bound
+    return None
+
+def metrics_snapshot():
+    # Histogram: [[batas atas ms, jumlah request], ...] urut bucket
+    bounds = list(LATENCY_BUCKETS_MS) + ['+Inf']
+    with _lock:
+        routes = {}
+        for route, s in sorted(_routes.items()):
+            routes[route] = {
+                'count': s['count'],
+                'errors': s['errors'],
+                'mean_ms': round(s['sum_ms'] / s['count'], 3),
+                'max_ms': round(s['max_ms'], 3),
+                'p50_ms_le': bucket_percentile(s['buckets'], s['count'], 50),
+                'p95_ms_le': bucket_percentile(s['buckets'], s['count'], 95),
+                'histogram_ms': [[bound, n] for bound, n in zip(bounds, s['buckets'])],
+            }
+        queries = [{'sql': sql, 'count': s['count'], 'mean_ms': round(s['sum_ms'] / s['count'], 3),
+                    'max_ms': round(s['max_ms'], 3), 'total_ms': round(s['sum_ms'], 3),
+                    'mean_rows': round(s['rows'] / s['count'], 1)}
+                   for sql, s in _queries.items()]
+    queries.sort(key=lambda q: q['total_ms'], reverse=True)
+    return {'uptime_s': round(time.time() - _started, 1), 'routes': routes, 'queries': queries}
+
+def install(app, engine):
+    """Pasang instrumentasi ke aplikasi Flask & engine SQLAlchemy"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    @app.route('/api/metrics')
+    def get_metrics():
+        return jsonify(metrics_snapshot())
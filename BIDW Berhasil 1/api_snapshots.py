@@ -0,0 +1,134 @@
+from datetime import datetime
+from urllib.parse import urlencode
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+# --- SNAPSHOT JSON API (PRECOMPUTED) ---
+# run_etl(snapshots=True) menyimpan response API yang selalu diminta index.html
+# (tahun, dashboard per tahun + All, halaman pertama list per pilihan sort) sebagai
+# file .json.gz + manifest berisi ETag. app.py melayani URL tersebut langsung dari
+# file (304 jika If-None-Match cocok, gzip jika klien menerima), jadi database
+# hanya disentuh untuk query di luar snapshot (search, cursor, tahun tak dikenal).
+# Lokasi dibaca dari env di sini (bukan di app.py) supaya ETL & app sepakat.
+DEFAULT_SNAPSHOT_DIR = os.environ.get('SALESREPORT_SNAPSHOT_DIR',
+                                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+MANIFEST_FILE = 'manifest.json'
+
+# Pilihan sort di index.html (halaman pertama tiap pilihan di-snapshot)
+SNAPSHOT_LIST_SORTS = {
+    '/api/products_list': [('sales', 'desc'), ('sales', 'asc'), ('name', 'asc'), ('name', 'desc')],
+    '/api/customers_list': [('id', 'asc'), ('name', 'asc'), ('name', 'desc'), ('country', 'asc')],
+}
+
+def snapshot_key(path, args):
+    """'/api/data' + {'year': '2013'} -> '/api/data?year=2013' (parameter diurutkan)"""
+    query = urlencode(sorted(args))
+    return f"{path}?{query}" if query else path
+
+def snapshot_urls(client):
+    """Daftar (path, args) yang di-snapshot; tahun diambil dari /api/years"""
+    urls = [('/api/years', []), ('/api/data', []), ('/api/data', [('year', 'All')])]
+    for year in client.get('/api/years').get_json() or []:
+        urls.append(('/api/data', [('year', str(year))]))
+    for path, sorts in SNAPSHOT_LIST_SORTS.items():
+        urls.append((path, []))
+        urls.extend((path, [('sort', sort), ('order', order)]) for sort, order in sorts)
+    return urls
+
+def snapshot_version(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Versi warehouse saat snapshot ditulis (None jika belum ada)"""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+            return json.load(f)['version']
+    except FileNotFoundError:
+        return None
+
+def clear_snapshots(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Hapus snapshot lama (dipanggil ETL saat load tanpa snapshot supaya app
+    tidak melayani data basi)"""
+    if os.path.exists(snapshot_dir):
+        shutil.rmtree(snapshot_dir)
+        return True
+    return False
+
+def write_snapshots(flask_app, version, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Render semua URL snapshot lewat test client lalu tulis .json.gz + manifest.
+
+    Snapshot lama dihapus dulu supaya response dirender dari database, lalu
+    folder baru ditulis di <dir>.tmp dan di-rename. Mengembalikan jumlah file.
+    """
+    clear_snapshots(snapshot_dir)
+    tmp_dir = snapshot_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    client = flask_app.test_client()
+    entries = {}
+    for path, args in snapshot_urls(client):
+        response = client.get(path, query_string=args)
+        if response.status_code != 200:
+            print(f"   [WARNING] Snapshot {path} {args} dilewati (status {response.status_code})")
+            continue
+        body = response.get_data()
+        key = snapshot_key(path, args)
+        digest = hashlib.sha256(body).hexdigest()
+        filename = f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.json.gz"
+        with open(os.path.join(tmp_dir, filename), 'wb') as f:
+            # mtime=0: isi gzip deterministik untuk body yang sama
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        entries[key] = {'file': filename, 'etag': f'"{version}-{digest[:20]}"', 'size': len(body)}
+
+    manifest = {'version': version, 'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'entries': entries}
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.rename(tmp_dir, snapshot_dir)
+    return len(entries)
+
+# --- SERVING (DIPASANG DI app.py) ---
+_manifest_state = {'mtime': None, 'manifest': None}
+
+def load_manifest(snapshot_dir):
+    """Manifest di-cache di memori; dibaca ulang hanya jika mtime file berubah"""
+    try:
+        mtime = os.stat(os.path.join(snapshot_dir, MANIFEST_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        _manifest_state.update(mtime=None, manifest=None)
+        return None
+    if mtime != _manifest_state['mtime']:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+            _manifest_state.update(mtime=mtime, manifest=json.load(f))
+    return _manifest_state['manifest']
+
+def install(app, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """before_request yang menjawab URL snapshot dari file (fallback: view biasa)"""
+    from flask import request
+
+    @app.before_request
+    def serve_snapshot():
+        if request.method != 'GET' or not request.path.startswith('/api/'):
+            return None
+        manifest = load_manifest(snapshot_dir)
+        if manifest is None:
+            return None
+        entry = manifest['entries'].get(snapshot_key(request.path, request.args.items(multi=True)))
+        if entry is None:
+            return None
+
+        headers = {'ETag': entry['etag'], 'Vary': 'Accept-Encoding',
+                   'Cache-Control': 'no-cache', 'X-Cache': 'SNAPSHOT'}
+        if entry['etag'].strip('"') in request.if_none_match:
+            return app.response_class(status=304, headers=headers)
+        try:
+            with open(os.path.join(snapshot_dir, entry['file']), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None  # snapshot sedang diganti ETL -> view biasa
+        if 'gzip' in request.accept_encodings:
+            headers['Content-Encoding'] = 'gzip'
+        else:
+            body = gzip.decompress(body)
+        return app.response_class(body, mimetype='application/json', headers=headers)
@@ -1,13 +1,93 @@
-from flask import Flask, render_template, jsonify, request
-from sqlalchemy import create_engine, text
+from flask import Flask, render_template, jsonify, request, g, stream_with_context
+from sqlalchemy import text
+from collections import OrderedDict
+from functools import wraps
 import pandas as pd
+import threading
 import os
 
+from warehouse_lists import query_list_page
+import parquet_store
+import api_metrics
+import api_snapshots
+import warehouse_export
+import warehouse_db
+
 app = Flask(__name__)
 
 # --- KONFIGURASI DATABASE ---
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_data_warehouse.db')
-engine = create_engine(f'sqlite:///{db_path}')
+db_path = os.environ.get('SALESREPORT_DB',
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_data_warehouse.db'))
+# Pool koneksi read-only bersama (WAL, cache/mmap); lihat warehouse_db.py
+engine = warehouse_db.create_readonly_engine(db_path, factory=api_metrics.TimedConnection)
+
+# Instrumentasi: header Server-Timing per request + GET /api/metrics.
+# Matikan dengan SALESREPORT_METRICS=0.
+if os.environ.get('SALESREPORT_METRICS', '1') != '0':
+    api_metrics.install(app, engine)
+
+# Snapshot JSON hasil `python ETL_pipeline.py --snapshots`: URL umum dijawab
+# langsung dari file .json.gz (ETag/304, gzip) sebelum view & cache di bawah.
+# Lokasi: SALESREPORT_SNAPSHOT_DIR (default folder snapshots/ di samping script).
+api_snapshots.install(app)
+
+# Backend query dashboard (/api/years & /api/data):
+#   'sqlite'  = tabel agregat di my_data_warehouse.db (default)
+#   'parquet' = store kolomnar partisi per tahun (python ETL_pipeline.py --parquet)
+QUERY_BACKEND = os.environ.get('SALESREPORT_BACKEND', 'sqlite')
+PARQUET_DIR = os.environ.get('SALESREPORT_PARQUET_DIR', parquet_store.DEFAULT_STORE_DIR)
+if QUERY_BACKEND == 'parquet' and not parquet_store.pyarrow_available():
+    print("   [WARNING] pyarrow tidak terpasang, backend dashboard kembali ke 'sqlite'.")
+    QUERY_BACKEND = 'sqlite'
+
+# --- CACHE RESPONSE API ---
+# Warehouse hanya berubah saat ETL jalan, jadi response API di-cache di memori.
+# Key = endpoint + parameter + versi warehouse (PRAGMA user_version yang dinaikkan
+# run_etl), sehingga cache otomatis kadaluarsa setelah setiap load.
+CACHE_MAX_ENTRIES = 256
+_response_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def warehouse_version():
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+def use_parquet():
+    # Store Parquet hanya dipakai jika ditulis dari versi warehouse yang sama.
+    # Store basi/hilang (load tanpa --parquet, atau selama store ditulis ulang)
+    # -> tabel agregat SQLite, jadi cache tidak pernah menyimpan data store lama.
+    return QUERY_BACKEND == 'parquet' and parquet_store.store_version(PARQUET_DIR) == warehouse_version()
+
+def cached_response(view):
+    """Decorator cache LRU untuk endpoint JSON (response error tidak di-cache)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            version = warehouse_version()
+        except Exception as e:
+            print(f"Error membaca versi warehouse: {e}")
+            return view(*args, **kwargs)
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), version)
+
+        with _cache_lock:
+            cached = _response_cache.get(key)
+            if cached is not None:
+                _response_cache.move_to_end(key)
+        if cached is not None:
+            response = app.response_class(cached, mimetype='application/json')
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = view(*args, **kwargs)
+        if response.status_code == 200 and not g.get('skip_cache'):
+            with _cache_lock:
+                _response_cache[key] = response.get_data()
+                _response_cache.move_to_end(key)
+                while len(_response_cache) > CACHE_MAX_ENTRIES:
+                    _response_cache.popitem(last=False)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
 
 @app.route('/')
 def index():
@@ -15,114 +95,200 @@ def index():
 
 # --- API BARU: AMBIL LIST TAHUN YANG TERSEDIA ---
 @app.route('/api/years')
+@cached_response
 def get_years():
     conn = engine.connect()
     try:
-        # Mengambil tahun unik dari Order_Date
-        query = text("SELECT DISTINCT strftime('%Y', Order_Date) as year FROM FactSales WHERE year IS NOT NULL ORDER BY year DESC")
+        # Mengambil tahun unik dari tabel agregat bulanan (hasil ETL)
+        if use_parquet():
+            return jsonify(parquet_store.parquet_years(PARQUET_DIR))
+        query = text("SELECT DISTINCT Order_Year as year FROM AggSalesMonthly WHERE year IS NOT NULL ORDER BY year DESC")
         df = pd.read_sql(query, conn)
         # Mengembalikan list tahun [2014, 2013, 2012, ...]
         return jsonify(df['year'].tolist())
     except Exception as e:
         print(f"Error getting years: {e}")
+        g.skip_cache = True
         return jsonify([])
     finally:
         conn.close()
 
+# --- QUERY DASHBOARD (SATU ROUND-TRIP) ---
+# KPI, trend bulanan dan top 5 produk diambil dalam SATU statement
+# (UNION ALL): baris 'trend' = isi AggSalesMonthly, baris 'product' = top 5.
+# KPI dijumlahkan dari baris trend di Python, tanpa membangun DataFrame.
+DASHBOARD_QUERY = """
+    SELECT * FROM (
+        SELECT 'trend' AS kind, Year_Month AS label, Total_Sales AS total, Total_Orders AS orders
+        FROM AggSalesMonthly
+        {date_filter}
+        ORDER BY label
+    )
+    UNION ALL
+    SELECT * FROM (
+        {top_products}
+    )
+"""
+TOP_PRODUCTS_ALL = """
+        SELECT 'product', Product_Name, Total_Sales, NULL
+        FROM AggProductSales
+        ORDER BY Total_Sales DESC, Product_Name
+        LIMIT 5
+"""
+TOP_PRODUCTS_YEAR = """
+        SELECT 'product', Product_Name, SUM(Total_Sales) AS total, NULL
+        FROM AggProductYearly
+        {date_filter}
+        GROUP BY Product_Name
+        ORDER BY total DESC, Product_Name
+        LIMIT 5
+"""
+
+EMPTY_DASHBOARD = {
+    'total_sales': '$0', 'total_orders': '0',
+    'products': {'labels': [], 'values': []},
+    'trend': {'labels': [], 'values': []}
+}
+
+def query_dashboard(conn, year):
+    """Payload /api/data untuk year (int) atau 'All' (= semua tahun)"""
+    # 1. Filter Tahun (Order_Year disimpan INTEGER oleh ETL, filter pakai index)
+    date_filter = ""
+    params = {}
+    top_products = TOP_PRODUCTS_ALL
+    if year != 'All':
+        date_filter = "WHERE Order_Year = :year"
+        params = {'year': year}
+        top_products = TOP_PRODUCTS_YEAR.format(date_filter=date_filter)
+    query = text(DASHBOARD_QUERY.format(date_filter=date_filter, top_products=top_products))
+    rows = conn.execute(query, params).fetchall()
+    # UNION ALL tidak menjamin urutan baris subquery -> urutkan ulang di sini
+    # (bulan NULL paling awal seperti ORDER BY SQLite, produk: sales lalu nama)
+    trend = sorted(((row.label, row.total, row.orders) for row in rows if row.kind == 'trend'),
+                   key=lambda r: (r[0] is not None, r[0] or ''))
+    products = sorted(((row.label, row.total) for row in rows if row.kind == 'product'),
+                      key=lambda r: (-r[1], r[0]))
+    return dashboard_payload(trend, products)
+
+def dashboard_payload(trend, products):
+    """trend = [(bulan, sales, orders)], products = [(nama, sales)] -> JSON /api/data"""
+    # 2. KPI dijumlahkan dari trend bulanan
+    sales = sum(total or 0 for _, total, _ in trend)
+    orders = sum(count or 0 for _, _, count in trend)
+    return {
+        'total_sales': f"${sales:,.2f}",
+        'total_orders': f"{orders:,}",
+        # 3. TOP 5 PRODUK
+        'products': {
+            'labels': [name for name, _ in products],
+            'values': [total for _, total in products]
+        },
+        # 4. TREND BULANAN
+        'trend': {
+            'labels': [month for month, _, _ in trend],
+            'values': [total for _, total, _ in trend]
+        }
+    }
+
 @app.route('/api/data')
+@cached_response
 def get_dashboard_data():
     year = request.args.get('year', 'All')
-    
-    # 1. Filter Tahun
-    date_filter = ""
     if year != 'All':
-        date_filter = f"WHERE strftime('%Y', Order_Date) = '{year}'"
+        year = request.args.get('year', type=int)
+        if year is None:
+            # Tahun tidak bisa di-parse: 400 (tidak di-cache), bukan dashboard kosong
+            response = jsonify({'error': "year harus berupa angka atau 'All'"})
+            response.status_code = 400
+            return response
+
+    if use_parquet():
+        try:
+            return jsonify(dashboard_payload(*parquet_store.parquet_dashboard_rows(year, PARQUET_DIR)))
+        except Exception as e:
+            print(f"ERROR API (parquet): {e}")
+            g.skip_cache = True
+            return jsonify(EMPTY_DASHBOARD)
 
     conn = engine.connect()
     try:
-        # 2. KPI
-        sales_query = text(f"SELECT IFNULL(SUM(Sales_Amount), 0) as val FROM FactSales {date_filter}")
-        orders_query = text(f"SELECT COUNT(*) as val FROM FactSales {date_filter}")
-        
-        sales = pd.read_sql(sales_query, conn).iloc[0]['val']
-        orders = pd.read_sql(orders_query, conn).iloc[0]['val']
-
-        # 3. TOP 5 PRODUK (Logic JOIN sudah diperbaiki)
-        top_prod_query = text(f"""
-            SELECT p.Product_Name, SUM(f.Sales_Amount) as total
-            FROM FactSales f
-            JOIN (
-                SELECT DISTINCT Product_Key, Product_Name 
-                FROM DimProduct
-            ) p ON p.Product_Key LIKE '%' || f.Product_Key 
-            {date_filter}
-            GROUP BY p.Product_Name
-            ORDER BY total DESC
-            LIMIT 5
-        """)
-        df_prod = pd.read_sql(top_prod_query, conn)
-        
-        products_data = {
-            'labels': df_prod['Product_Name'].tolist(),
-            'values': df_prod['total'].tolist()
-        }
-
-        # 4. TREND BULANAN
-        trend_query = text(f"""
-            SELECT strftime('%Y-%m', Order_Date) as month, SUM(Sales_Amount) as total
-            FROM FactSales
-            {date_filter}
-            GROUP BY month
-            ORDER BY month
-        """)
-        df_trend = pd.read_sql(trend_query, conn)
-        trend_data = {
-            'labels': df_trend['month'].tolist(),
-            'values': df_trend['total'].tolist()
-        }
-
-        return jsonify({
-            'total_sales': f"${sales:,.2f}", 
-            'total_orders': f"{orders:,}",
-            'products': products_data, 
-            'trend': trend_data
-        })
-        
+        return jsonify(query_dashboard(conn, year))
     except Exception as e:
         print(f"ERROR API: {e}")
-        return jsonify({
-            'total_sales': '$0', 'total_orders': '0',
-            'products': {'labels': [], 'values': []},
-            'trend': {'labels': [], 'values': []}
-        })
+        g.skip_cache = True
+        return jsonify(EMPTY_DASHBOARD)
     finally:
         conn.close()
 
-@app.route('/api/products_list')
-def get_products_list():
+def list_page_response(name):
+    """Response JSON satu halaman list; parameter: sort, order, q, cursor, limit"""
     conn = engine.connect()
     try:
-        q = text("""
-            SELECT p.Product_Name, p.Product_Line, IFNULL(SUM(f.Sales_Amount), 0) as sales 
-            FROM (SELECT DISTINCT Product_Key, Product_Name, Product_Line FROM DimProduct) p 
-            LEFT JOIN FactSales f ON p.Product_Key LIKE '%' || f.Product_Key
-            GROUP BY p.Product_Name 
-            ORDER BY sales DESC 
-            LIMIT 50
-        """)
-        df = pd.read_sql(q, conn)
-        return jsonify(df.to_dict(orient='records'))
-    except: return jsonify([])
-    finally: conn.close()
+        page = query_list_page(conn, name,
+                               sort=request.args.get('sort'),
+                               order=request.args.get('order'),
+                               q=request.args.get('q'),
+                               cursor=request.args.get('cursor'),
+                               limit=request.args.get('limit', type=int))
+        return jsonify(page)
+    except ValueError as e:
+        # Cursor rusak (decode_cursor): 400, bukan list kosong yang terlihat seperti akhir data
+        response = jsonify({'error': str(e)})
+        response.status_code = 400
+        return response
+    except Exception as e:
+        print(f"Error list {name}: {e}")
+        g.skip_cache = True
+        return jsonify({'items': [], 'next_cursor': None})
+    finally:
+        conn.close()
+
+@app.route('/api/products_list')
+@cached_response
+def get_products_list():
+    return list_page_response('products')
 
 @app.route('/api/customers_list')
+@cached_response
 def get_customers_list():
-    conn = engine.connect()
+    return list_page_response('customers')
+
+# --- EXPORT DATA MENTAH (STREAMING) ---
+# /api/export?format=csv|parquet&year=2013&product=<Product_Key>&customer=<Customer_ID>
+# (parameter boleh diulang). Baris dikirim bertahap lewat generator; tidak di-cache.
+@app.route('/api/export')
+def export_sales():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in warehouse_export.EXPORT_FORMATS:
+        return jsonify({'error': f"format harus salah satu dari {', '.join(warehouse_export.EXPORT_FORMATS)}"}), 400
+    if fmt == 'parquet' and not warehouse_export.pyarrow_available():
+        return jsonify({'error': "export Parquet membutuhkan pyarrow di server"}), 400
     try:
-        df = pd.read_sql("SELECT Customer_ID as id, First_Name || ' ' || Last_Name as name, 'USA' as country FROM DimCustomer LIMIT 50", conn)
-        return jsonify(df.to_dict(orient='records'))
-    except: return jsonify([])
-    finally: conn.close()
+        years = [int(y) for y in request.args.getlist('year') if y != 'All']
+        customers = [int(c) for c in request.args.getlist('customer')]
+    except ValueError:
+        return jsonify({'error': "year & customer harus berupa angka"}), 400
+    products = [p for p in request.args.getlist('product') if p]
+    query, params = warehouse_export.export_query(years, products, customers)
+    write = warehouse_export.iter_csv if fmt == 'csv' else warehouse_export.iter_parquet
+
+    def generate():
+        # Koneksi dipinjam dari pool selama stream berjalan, dikembalikan di akhir
+        conn = engine.connect()
+        try:
+            yield from write(warehouse_export.iter_batches(conn, query, params))
+        except Exception as e:
+            # Header sudah terkirim: error hanya bisa dicatat, response terpotong
+            print(f"Error export: {e}")
+            raise
+        finally:
+            conn.close()
+
+    filename = f"sales_export{''.join(f'_{y}' for y in years)}.{fmt}"
+    return app.response_class(stream_with_context(generate()),
+                              mimetype=warehouse_export.EXPORT_FORMATS[fmt],
+                              headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                                       'Cache-Control': 'no-store'})
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode
+import argparse
+import asyncio
+import os
+
+import warehouse_db
+
+# --- MODE SERVER ASYNC (ASGI) ---
+# Endpoint yang sama dengan app.py, dilayani lewat event loop uvicorn:
+#   python app_async.py --port 8000 --workers 5
+# Setiap request diteruskan ke aplikasi Flask di app.py (cache, snapshot,
+# metrics ikut terpakai), tapi dijalankan di thread pool terbatas sehingga
+# event loop tidak pernah menunggu SQL. Request GET identik yang datang
+# bersamaan (misal banyak klien membuka /api/data?year=2013) digabung:
+# hanya satu yang benar-benar diproses, sisanya menunggu hasil yang sama.
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+# Default = ukuran pool koneksi read-only, jadi tiap worker memegang satu koneksi
+ASYNC_WORKERS = int(os.environ.get('SALESREPORT_ASYNC_WORKERS', warehouse_db.POOL_SIZE))
+# Header yang boleh mempengaruhi response GET (bagian dari key penggabungan)
+FORWARDED_HEADERS = ('accept-encoding', 'if-none-match')
+# Endpoint yang response-nya di-stream per potongan (tidak digabung/di-buffer)
+STREAMING_PATHS = ('/api/export',)
+# Potongan yang boleh antre per stream sebelum worker menunggu klien (backpressure)
+STREAM_QUEUE_CHUNKS = 4
+
+_executor = None
+_inflight = {}
+stats = {'requests': 0, 'coalesced': 0}
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix='salesreport')
+    return _executor
+
+def get_flask_app():
+    # Import saat dipakai: engine & konfigurasi dibuat sekali per proses server
+    from app import app as flask_app
+    return flask_app
+
+def forward(method, path, query, headers, body=b''):
+    """Jalankan satu request di aplikasi Flask (dipanggil di thread worker)"""
+    client = get_flask_app().test_client(use_cookies=False)
+    response = client.open(path, method=method, query_string=query, headers=headers, data=body)
+    return response.status_code, list(response.headers.items()), response.get_data()
+
+def coalesce_key(method, path, query, headers):
+    """Request dengan key sama pasti menghasilkan response yang sama"""
+    return (method, path, urlencode(sorted(parse_qsl(query, keep_blank_values=True))),
+            tuple(headers.get(name, '') for name in FORWARDED_HEADERS))
+
+async def dispatch(method, path, query, headers, body):
+    loop = asyncio.get_running_loop()
+    stats['requests'] += 1
+    if method not in ('GET', 'HEAD'):
+        return await loop.run_in_executor(get_executor(), forward, method, path, query, headers, body)
+
+    key = coalesce_key(method, path, query, headers)
+    future = _inflight.get(key)
+    coalesced = future is not None
+    if coalesced:
+        stats['coalesced'] += 1
+    else:
+        # Hanya header yang relevan diteruskan, supaya hasil sah dibagi ke semua penunggu
+        forwarded = {name: headers[name] for name in FORWARDED_HEADERS if name in headers}
+        future = loop.run_in_executor(get_executor(), forward, method, path, query, forwarded)
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: klien yang putus tidak membatalkan hasil untuk penunggu lain
+    status, response_headers, data = await asyncio.shield(future)
+    if coalesced:
+        response_headers = response_headers + [('X-Coalesced', '1')]
+    return status, response_headers, data
+
+async def stream(send, method, path, query, headers):
+    """Kirim response Flask per potongan saat dibuat di thread worker.
+
+    Queue antara worker & event loop dibatasi STREAM_QUEUE_CHUNKS, jadi memori
+    tetap kecil walaupun klien lambat; worker menunggu sampai potongan terkirim.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    cancelled = False
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        # Item queue: (status, headers), lalu potongan bytes, lalu None (selesai)
+        # atau exception (gagal) -> consumer tidak pernah menunggu queue.get() selamanya
+        response = None
+        try:
+            client = get_flask_app().test_client(use_cookies=False)
+            response = client.open(path, method=method, query_string=query, headers=headers, buffered=False)
+            put((response.status_code, list(response.headers.items())))
+            for chunk in response.iter_encoded():
+                if cancelled:
+                    break
+                put(chunk)
+            put(None)
+        except Exception as e:
+            put(e)
+            raise
+        finally:
+            if response is not None:
+                response.close()
+
+    stats['requests'] += 1
+    worker = loop.run_in_executor(get_executor(), produce)
+    try:
+        first = await queue.get()
+        if isinstance(first, Exception):
+            # Gagal sebelum header terkirim: 500 (error dicatat di bawah)
+            await send({'type': 'http.response.start', 'status': 500,
+                        'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': b'{"error": "internal"}'})
+            return
+        status, response_headers = first
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in response_headers]})
+        while (chunk := await queue.get()) is not None:
+            if isinstance(chunk, Exception):
+                # Header sudah terkirim: body tidak ditutup normal, koneksi diputus
+                # server ASGI sehingga klien tahu response terpotong
+                raise chunk
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        # Klien putus: hentikan worker & kosongkan queue supaya put() tidak menggantung
+        cancelled = True
+        while not worker.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+        if not worker.cancelled() and worker.exception() is not None:
+            print(f"Error stream {path}: {worker.exception()}")
+
+async def read_body(receive):
+    body = b''
+    more = True
+    while more:
+        message = await receive()
+        body += message.get('body', b'')
+        more = message.get('more_body', False)
+    return body
+
+async def app(scope, receive, send):
+    """Aplikasi ASGI (uvicorn app_async:app)"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Flask app & engine dimuat sebelum request pertama
+                await asyncio.get_running_loop().run_in_executor(get_executor(), get_flask_app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                get_executor().shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    body = await read_body(receive)
+    headers = {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope['headers']}
+    if scope['path'] in STREAMING_PATHS and scope['method'] == 'GET':
+        await stream(send, scope['method'], scope['path'], scope['query_string'].decode('latin1'), headers)
+        return
+    try:
+        status, response_headers, data = await dispatch(scope['method'], scope['path'],
+                                                        scope['query_string'].decode('latin1'),
+                                                        headers, body)
+    except Exception as e:
+        print(f"Error di server async: {e}")
+        status, response_headers, data = 500, [('Content-Type', 'application/json')], b'{"error": "internal"}'
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in response_headers]})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else data})
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Server async (ASGI/uvicorn) untuk endpoint app.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=ASYNC_WORKERS,
+                        help="Jumlah thread untuk query (default: ukuran pool koneksi)")
+    args = parser.parse_args()
+    if uvicorn is None:
+        raise SystemExit("Mode async membutuhkan uvicorn (pip install uvicorn)")
+    ASYNC_WORKERS = args.workers
+    print(f">>> Server async di http://{args.host}:{args.port} ({ASYNC_WORKERS} worker query)")
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
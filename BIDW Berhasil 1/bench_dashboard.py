@@ -0,0 +1,89 @@
+import pandas as pd
+from sqlalchemy import text
+import argparse
+import time
+
+from app import engine, query_dashboard
+
+# Benchmark /api/data: jalur lama (4x pd.read_sql) vs query_dashboard (1 round-trip).
+# Cache response app.py tidak ikut diukur; yang diukur murni query + bentuk payload.
+
+def legacy_dashboard(conn, year):
+    """Jalur lama get_dashboard_data: 4 query terpisah, masing-masing lewat pd.read_sql"""
+    date_filter = ""
+    params = {}
+    if year != 'All':
+        date_filter = "WHERE Order_Year = :year"
+        params = {'year': year}
+
+    sales_query = text(f"SELECT IFNULL(SUM(Total_Sales), 0) as val FROM AggSalesMonthly {date_filter}")
+    orders_query = text(f"SELECT IFNULL(SUM(Total_Orders), 0) as val FROM AggSalesMonthly {date_filter}")
+    sales = pd.read_sql(sales_query, conn, params=params).iloc[0]['val']
+    orders = pd.read_sql(orders_query, conn, params=params).iloc[0]['val']
+
+    if year == 'All':
+        top_prod_query = text("""
+            SELECT Product_Name, Total_Sales as total
+            FROM AggProductSales
+            ORDER BY total DESC
+            LIMIT 5
+        """)
+    else:
+        top_prod_query = text(f"""
+            SELECT Product_Name, SUM(Total_Sales) as total
+            FROM AggProductYearly
+            {date_filter}
+            GROUP BY Product_Name
+            ORDER BY total DESC
+            LIMIT 5
+        """)
+    df_prod = pd.read_sql(top_prod_query, conn, params=params)
+
+    trend_query = text(f"""
+        SELECT Year_Month as month, Total_Sales as total
+        FROM AggSalesMonthly
+        {date_filter}
+        ORDER BY month
+    """)
+    df_trend = pd.read_sql(trend_query, conn, params=params)
+    return {
+        'total_sales': f"${sales:,.2f}",
+        'total_orders': f"{orders:,}",
+        'products': {'labels': df_prod['Product_Name'].tolist(), 'values': df_prod['total'].tolist()},
+        'trend': {'labels': df_trend['month'].tolist(), 'values': df_trend['total'].tolist()}
+    }
+
+def time_request(func, year, repeat):
+    """Median & p95 latency (ms) satu request: buka koneksi, query, tutup"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            func(conn, year)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+def run_benchmark(repeat=200):
+    with engine.connect() as conn:
+        years = [row[0] for row in conn.execute(text(
+            "SELECT DISTINCT Order_Year FROM AggSalesMonthly WHERE Order_Year IS NOT NULL ORDER BY Order_Year"))]
+
+    print(f"=== BENCHMARK /api/data ({repeat} request per tahun) ===")
+    print(f"{'Tahun':>6} | {'lama p50':>9} {'lama p95':>9} | {'baru p50':>9} {'baru p95':>9} | {'speed-up':>8}")
+    results = {}
+    for year in ['All'] + years:
+        # Pemanasan: page cache SQLite & pool koneksi
+        time_request(legacy_dashboard, year, 5)
+        time_request(query_dashboard, year, 5)
+        old_p50, old_p95 = time_request(legacy_dashboard, year, repeat)
+        new_p50, new_p95 = time_request(query_dashboard, year, repeat)
+        results[year] = {'legacy_ms': old_p50, 'single_query_ms': new_p50}
+        print(f"{year:>6} | {old_p50:8.2f}ms {old_p95:8.2f}ms | {new_p50:8.2f}ms {new_p95:8.2f}ms | {old_p50 / new_p50:7.1f}x")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bandingkan latency /api/data sebelum & sesudah query tunggal")
+    parser.add_argument('--repeat', type=int, default=200, help="Jumlah request per tahun (default 200)")
+    args = parser.parse_args()
+    run_benchmark(args.repeat)
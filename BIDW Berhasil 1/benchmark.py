@@ -0,0 +1,257 @@
+import pandas as pd
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Benchmark ETL + API pada data sintetis berskala 1x / 10x / 100x.
+#   python benchmark.py --scales 1 10 --output bench_results.json
+#   python benchmark.py --scales 1 --compare bench_results.json   (cek regresi)
+# Database & CSV sintetis ditulis ke --workdir (default: folder temp), bukan
+# ke my_data_warehouse.db milik aplikasi.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Jarak ID antar salinan data supaya ID/nomor order hasil salinan tidak bentrok
+CUSTOMER_ID_STRIDE = 100_000
+ORDER_NUMBER_STRIDE = 100_000
+GENERATOR_CHUNKSIZE = 100_000
+
+# Request tambahan per endpoint (selain tanpa parameter). {year} diisi tahun
+# pertama dari /api/years, {cursor} diisi next_cursor halaman pertama.
+ENDPOINT_VARIANTS = {
+    '/api/data': ['/api/data?year=All', '/api/data?year={year}'],
+    '/api/products_list': ['/api/products_list?sort=name&q=Mountain',
+                           '/api/products_list?cursor={cursor}'],
+    '/api/customers_list': ['/api/customers_list?sort=name&q=Jo',
+                            '/api/customers_list?sort=country&order=desc',
+                            '/api/customers_list?cursor={cursor}'],
+}
+
+# --- 1. GENERATOR DATA SINTETIS ---
+def shift_id_text(series, offset):
+    """'NASAW00011000' + 100000 -> 'NASAW00111000' (prefix & lebar digit dipertahankan)"""
+    parts = series.str.extract(r'^(\D*)(\d+)$')
+    digits = parts[1].fillna('')
+    shifted = (pd.to_numeric(digits, errors='coerce') + offset).astype('Int64').astype(str)
+    out = parts[0].fillna('') + shifted.str.zfill(digits.str.len().max())
+    # Nilai yang tidak berpola prefix+angka (kotor/kosong) dibiarkan apa adanya
+    return out.where(parts[1].notna(), series)
+
+def read_source_text(path):
+    """CSV dibaca sebagai teks apa adanya supaya nilai kotor ikut tersalin"""
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding='latin1')
+
+def generate_dataset(source_dir, target_dir, scale):
+    """Tulis source_crm/ & source_erp/ berisi 'scale' salinan data asli.
+
+    Customer & sales disalin dengan ID/nomor order digeser per salinan;
+    produk & kategori tetap (katalog tidak ikut membesar). Mengembalikan
+    jumlah baris per file.
+    """
+    counts = {}
+    for folder in ('source_crm', 'source_erp'):
+        os.makedirs(os.path.join(target_dir, folder), exist_ok=True)
+
+    def replicate(rel_path, shift_columns):
+        src = os.path.join(source_dir, rel_path)
+        dst = os.path.join(target_dir, rel_path)
+        rows = 0
+        with open(dst, 'w', newline='', encoding='latin1') as out:
+            for copy in range(scale):
+                for chunk_no, chunk in enumerate(pd.read_csv(src, dtype=str, keep_default_na=False,
+                                                             encoding='latin1', chunksize=GENERATOR_CHUNKSIZE)):
+                    for column, stride in shift_columns.items():
+                        chunk[column] = shift_id_text(chunk[column], copy * stride)
+                    chunk.to_csv(out, index=False, header=(copy == 0 and chunk_no == 0))
+                    rows += len(chunk)
+        counts[rel_path] = rows
+
+    replicate('source_crm/cust_info.csv', {'cst_id': CUSTOMER_ID_STRIDE, 'cst_key': CUSTOMER_ID_STRIDE})
+    replicate('source_crm/sales_details.csv', {'sls_ord_num': ORDER_NUMBER_STRIDE,
+                                               'sls_cust_id': CUSTOMER_ID_STRIDE})
+    replicate('source_erp/CUST_AZ12.csv', {'CID': CUSTOMER_ID_STRIDE})
+    replicate('source_erp/LOC_A101.csv', {'CID': CUSTOMER_ID_STRIDE})
+    for rel_path in ('source_crm/prd_info.csv', 'source_erp/PX_CAT_G1V2.csv'):
+        df = read_source_text(os.path.join(source_dir, rel_path))
+        df.to_csv(os.path.join(target_dir, rel_path), index=False, encoding='latin1')
+        counts[rel_path] = len(df)
+    return counts
+
+# --- 2. BENCHMARK ETL ---
+def bench_etl(data_dir, chunksize, workers, verbose):
+    from ETL_pipeline import run_etl, peak_memory_mb
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, 'w')))
+        stages = run_etl(mode='full', chunksize=chunksize, workers=workers, base_dir=data_dir)
+    return {
+        'stages_s': {name: round(seconds, 4) for name, seconds in stages.items()},
+        'total_s': round(time.perf_counter() - start, 4),
+        'peak_rss_mb': peak_memory_mb(),
+    }
+
+# --- 3. BENCHMARK ENDPOINT FLASK ---
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(samples):
+    return {'p50_ms': round(statistics.median(samples), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'n': len(samples)}
+
+def endpoint_urls(client, flask_app):
+    """Semua endpoint GET app.py (tanpa argumen path) + varian dari ENDPOINT_VARIANTS"""
+    years = client.get('/api/years').get_json() or []
+    fill = {'year': years[0] if years else 'All'}
+    urls = []
+    for rule in sorted(flask_app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint == 'static' or rule.arguments or 'GET' not in rule.methods:
+            continue
+        urls.append(rule.rule)
+        for variant in ENDPOINT_VARIANTS.get(rule.rule, []):
+            if '{cursor}' in variant:
+                first_page = client.get(rule.rule).get_json() or {}
+                if not first_page.get('next_cursor'):
+                    continue
+                fill['cursor'] = first_page['next_cursor']
+            urls.append(variant.format(**fill))
+    return urls
+
+def timed_get(client, url):
+    """(status, ms) satu request; body dibaca penuh di dalam waktu yang diukur,
+    supaya endpoint streaming (/api/export) terukur sampai byte terakhir, lalu
+    response ditutup (generator & cursor DB dilepas)"""
+    start = time.perf_counter()
+    response = client.get(url)
+    try:
+        response.get_data()
+        return response.status_code, (time.perf_counter() - start) * 1000
+    finally:
+        response.close()
+
+def bench_endpoints(repeat):
+    """Latency tiap URL lewat test client: 'uncached' (cache response dikosongkan
+    sebelum tiap request) dan 'cached' (request berulang, cache terisi)"""
+    import app as flask_module
+    client = flask_module.app.test_client()
+    results = {}
+    for url in endpoint_urls(client, flask_module.app):
+        uncached, cached = [], []
+        status = None
+        for _ in range(repeat):
+            flask_module._response_cache.clear()
+            status, ms = timed_get(client, url)
+            uncached.append(ms)
+        for _ in range(repeat):
+            cached.append(timed_get(client, url)[1])
+        results[url] = {'status': status, 'uncached': summarize(uncached), 'cached': summarize(cached)}
+    return results
+
+# --- 4. HASIL & PERBANDINGAN ---
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare_results(baseline, current, threshold):
+    """Cetak metrik yang melambat > threshold (0.2 = 20%); return jumlah regresi"""
+    regressions = 0
+    for scale, result in current['scales'].items():
+        base = baseline.get('scales', {}).get(scale)
+        if base is None:
+            continue
+        metrics = [(f"etl.{name}", base['etl']['stages_s'].get(name), seconds)
+                   for name, seconds in result['etl']['stages_s'].items()]
+        metrics.append(('etl.total', base['etl']['total_s'], result['etl']['total_s']))
+        for url, timing in result['endpoints'].items():
+            old = base['endpoints'].get(url)
+            if old:
+                metrics.append((f"GET {url}", old['uncached']['p50_ms'], timing['uncached']['p50_ms']))
+        for name, old, new in metrics:
+            if not old:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions += 1
+                print(f"   [REGRESI] {scale}x {name}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    print(f"   {regressions} regresi (ambang {threshold:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ETL & API SalesReport dengan data sintetis")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help="Faktor skala data sintetis (default: 1 10 100)")
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'salesreport_bench'),
+                        help="Folder untuk CSV sintetis & database benchmark")
+    parser.add_argument('--output', default='bench_results.json', help="File hasil JSON")
+    parser.add_argument('--repeat', type=int, default=30, help="Jumlah request per URL")
+    parser.add_argument('--chunksize', type=int, default=None, help="Diteruskan ke run_etl")
+    parser.add_argument('--workers', type=int, default=None, help="Diteruskan ke run_etl")
+    parser.add_argument('--compare', default=None, help="File hasil sebelumnya untuk cek regresi")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Ambang regresi (default 0.2 = 20%%)")
+    parser.add_argument('--verbose', action='store_true', help="Tampilkan log run_etl")
+    args = parser.parse_args()
+
+    # Database benchmark terpisah: harus di-set sebelum ETL_pipeline/app di-import
+    os.makedirs(args.workdir, exist_ok=True)
+    os.environ['SALESREPORT_DB'] = os.path.join(args.workdir, 'bench_warehouse.db')
+    os.environ['SALESREPORT_SNAPSHOT_DIR'] = os.path.join(args.workdir, 'snapshots')
+    os.environ['SALESREPORT_PARQUET_DIR'] = os.path.join(args.workdir, 'parquet_store')
+    sys.path.insert(0, SCRIPT_DIR)
+    from ETL_pipeline import find_data_directory
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        source_dir = find_data_directory()
+
+    results = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {'repeat': args.repeat, 'chunksize': args.chunksize, 'workers': args.workers},
+        'scales': {},
+    }
+    for scale in args.scales:
+        print(f"\n=== SKALA {scale}x ===")
+        data_dir = os.path.join(args.workdir, f'data_{scale}x')
+        start = time.perf_counter()
+        rows = generate_dataset(source_dir, data_dir, scale)
+        print(f"   [OK] Data sintetis: {rows['source_crm/sales_details.csv']} baris sales "
+              f"({time.perf_counter() - start:.1f} s)")
+
+        etl = bench_etl(data_dir, args.chunksize, args.workers, args.verbose)
+        for name, seconds in etl['stages_s'].items():
+            print(f"   {name:<20} {seconds:8.3f} s")
+        print(f"   {'ETL TOTAL':<20} {etl['total_s']:8.3f} s")
+
+        endpoints = bench_endpoints(args.repeat)
+        for url, timing in endpoints.items():
+            print(f"   GET {url:<50} {timing['status']}  uncached p50 {timing['uncached']['p50_ms']:7.2f} ms"
+                  f"  cached p50 {timing['cached']['p50_ms']:6.2f} ms")
+        results['scales'][str(scale)] = {'rows': rows, 'etl': etl, 'endpoints': endpoints}
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n>>> Hasil benchmark ditulis ke {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\n=== PERBANDINGAN DENGAN {args.compare} ===")
+        if compare_results(baseline, results, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text, pool
+from sqlalchemy import text
 import plotly.express as px
 import os
 
+from warehouse_lists import query_list_page
+import parquet_store
+import warehouse_db
+
 # --- 1. CONFIG HALAMAN (WAJIB PALING ATAS) ---
 st.set_page_config(
     page_title="Executive Dashboard",
@@ -126,13 +130,142 @@ st.markdown(f"""
 @st.cache_resource
 def get_engine():
     # Pastikan path benar
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_data_warehouse.db')
-    # Gunakan NullPool agar SQLite tidak terkunci (Database Locked Error)
-    return create_engine(f'sqlite:///{db_path}', poolclass=pool.NullPool)
+    db_path = os.environ.get('SALESREPORT_DB',
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'my_data_warehouse.db'))
+    # Pool koneksi read-only (WAL) dipakai bersama semua sesi & rerun: tidak
+    # membuka koneksi baru per query dan tidak terkunci saat ETL menulis
+    return warehouse_db.create_readonly_engine(db_path)
 
 engine = get_engine()
 
+# Backend angka dashboard: 'sqlite' (default) atau 'parquet' (sama dengan app.py)
+QUERY_BACKEND = os.environ.get('SALESREPORT_BACKEND', 'sqlite')
+PARQUET_DIR = os.environ.get('SALESREPORT_PARQUET_DIR', parquet_store.DEFAULT_STORE_DIR)
+if QUERY_BACKEND == 'parquet' and not parquet_store.pyarrow_available():
+    QUERY_BACKEND = 'sqlite'
+
+# --- 5a. CACHE QUERY (KEY = VERSI WAREHOUSE) ---
+# Semua data diambil lewat fungsi st.cache_data yang menerima versi warehouse
+# (PRAGMA user_version, dinaikkan run_etl setiap load). Rerun karena interaksi UI
+# (ganti menu, dark mode, dll.) memakai hasil cache; setelah ETL load versi
+# berubah sehingga data baru langsung terbaca. TTL hanya batas aman memori.
+DATA_CACHE_TTL_S = 3600
+DATA_CACHE_MAX_ENTRIES = 256
+
+def warehouse_version():
+    """Stempel versi data: satu PRAGMA (header database), bukan query data"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("PRAGMA user_version")).scalar()
+    except Exception:
+        return None
+
+def use_parquet(version):
+    """Store Parquet hanya dipakai jika ditulis dari versi warehouse yang sama
+    (store basi/hilang setelah load tanpa --parquet -> SQLite)"""
+    return QUERY_BACKEND == 'parquet' and parquet_store.store_version(PARQUET_DIR) == version
+
+def cached_query(func):
+    """st.cache_data dengan TTL; argumen pertama fungsi = versi warehouse (hanya key cache)"""
+    return st.cache_data(ttl=DATA_CACHE_TTL_S, max_entries=DATA_CACHE_MAX_ENTRIES,
+                         show_spinner=False)(func)
+
+# --- 5b. LIST DENGAN KEYSET PAGINATION ---
+def list_page_controls(name, sort_options):
+    """Search + sort + tombol Prev/Next; mengembalikan halaman dari query_list_page().
+
+    Cursor tiap halaman yang sudah dibuka disimpan di session_state sebagai stack,
+    sehingga Prev cukup kembali ke cursor sebelumnya (tanpa OFFSET).
+    """
+    c1, c2 = st.columns([3, 1])
+    q = c1.text_input("Search", placeholder="Cari berdasarkan awalan nama...", key=f"{name}_q")
+    sort_label = c2.selectbox("Sort", list(sort_options), key=f"{name}_sort")
+    sort, order = sort_options[sort_label]
+
+    # Reset ke halaman pertama jika search/sort berubah
+    state_key = f"{name}_cursors"
+    if st.session_state.get(f"{name}_filter") != (q, sort, order):
+        st.session_state[f"{name}_filter"] = (q, sort, order)
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+
+    page = load_list_page(data_version, name, sort, order, q, cursors[-1])
+
+    p1, p2, p3 = st.columns([1, 1, 4])
+    if p1.button("◀ Prev", key=f"{name}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if p2.button("Next ▶", key=f"{name}_next", disabled=page['next_cursor'] is None):
+        cursors.append(page['next_cursor'])
+        st.rerun()
+    p3.caption(f"Halaman {len(cursors)}")
+    return page
+
+@cached_query
+def load_list_page(version, name, sort, order, q, cursor):
+    conn = engine.connect()
+    try:
+        return query_list_page(conn, name, sort=sort, order=order, q=q, cursor=cursor)
+    finally:
+        conn.close()
+
+# --- 5c. DATA DASHBOARD (PER BACKEND) ---
+@cached_query
+def load_years(version):
+    if use_parquet(version):
+        return parquet_store.parquet_years(PARQUET_DIR)
+    conn = engine.connect()
+    df_years = pd.read_sql(text("SELECT DISTINCT Order_Year as y FROM AggSalesMonthly WHERE y IS NOT NULL ORDER BY y DESC"), conn)
+    conn.close()
+    return df_years['y'].tolist()
+
+@cached_query
+def load_dashboard(version, selected_year):
+    """(sales, orders, df_trend, df_prod) untuk tahun terpilih, sesuai QUERY_BACKEND"""
+    if use_parquet(version):
+        return load_dashboard_parquet(selected_year)
+    return load_dashboard_sqlite(selected_year)
+
+def load_dashboard_sqlite(selected_year):
+    """(sales, orders, df_trend, df_prod) dari tabel agregat SQLite"""
+    conn = engine.connect()
+    # Semua angka dibaca dari tabel agregat hasil ETL (bukan scan FactSales)
+    filter_sql = "" if selected_year == 'All Time' else "WHERE Order_Year = :year"
+    params = {} if selected_year == 'All Time' else {'year': selected_year}
+
+    # Query Data
+    sales = pd.read_sql(text(f"SELECT IFNULL(SUM(Total_Sales), 0) FROM AggSalesMonthly {filter_sql}"), conn, params=params).iloc[0,0]
+    orders = pd.read_sql(text(f"SELECT IFNULL(SUM(Total_Orders), 0) FROM AggSalesMonthly {filter_sql}"), conn, params=params).iloc[0,0]
+
+    # Trend
+    df_trend = pd.read_sql(text(f"SELECT Year_Month as month, Total_Sales as total FROM AggSalesMonthly {filter_sql} ORDER BY month"), conn, params=params)
+
+    # Top Products
+    if selected_year == 'All Time':
+        prod_sql = "SELECT Product_Name, Total_Sales as total FROM AggProductSales ORDER BY total DESC, Product_Name LIMIT 5"
+    else:
+        prod_sql = f"""
+            SELECT Product_Name, SUM(Total_Sales) as total 
+            FROM AggProductYearly 
+            {filter_sql} 
+            GROUP BY Product_Name ORDER BY total DESC, Product_Name LIMIT 5
+        """
+    df_prod = pd.read_sql(text(prod_sql), conn, params=params)
+    conn.close()
+    return sales, orders, df_trend, df_prod
+
+def load_dashboard_parquet(selected_year):
+    """(sales, orders, df_trend, df_prod) dari store Parquet: hanya partisi
+    tahun terpilih & kolom yang dipakai yang dibaca"""
+    trend, top = parquet_store.parquet_dashboard_rows(
+        'All' if selected_year == 'All Time' else selected_year, PARQUET_DIR)
+    df_trend = pd.DataFrame(trend, columns=['month', 'total', 'orders'])
+    df_prod = pd.DataFrame(top, columns=['Product_Name', 'total'])
+    return df_trend['total'].sum(), int(df_trend['orders'].sum()), df_trend, df_prod
+
 # --- 6. SIDEBAR MENU ---
+data_version = warehouse_version()
+
 with st.sidebar:
     st.markdown("<h1>📊 DataViz</h1>", unsafe_allow_html=True)
     selected_page = st.radio("Menu", ["Dashboard", "Products", "Customers", "Settings"], label_visibility="collapsed")
@@ -141,10 +274,7 @@ with st.sidebar:
     # Ambil Tahun (Error Handling jika DB sibuk)
     years = []
     try:
-        conn = engine.connect()
-        df_years = pd.read_sql(text("SELECT DISTINCT strftime('%Y', Order_Date) as y FROM FactSales WHERE y IS NOT NULL ORDER BY y DESC"), conn)
-        years = df_years['y'].tolist()
-        conn.close()
+        years = load_years(data_version)
     except:
         pass # Jika gagal load tahun, biarkan kosong dulu
 
@@ -169,27 +299,7 @@ st.markdown(f"""
 # >>> DASHBOARD
 if selected_page == "Dashboard":
     try:
-        conn = engine.connect()
-        filter_sql = "" if selected_year == 'All Time' else f"WHERE strftime('%Y', Order_Date) = '{selected_year}'"
-
-        # Query Data
-        sales = pd.read_sql(text(f"SELECT IFNULL(SUM(Sales_Amount), 0) FROM FactSales {filter_sql}"), conn).iloc[0,0]
-        orders = pd.read_sql(text(f"SELECT COUNT(*) FROM FactSales {filter_sql}"), conn).iloc[0,0]
-        
-        # Trend
-        df_trend = pd.read_sql(text(f"SELECT strftime('%Y-%m', Order_Date) as month, SUM(Sales_Amount) as total FROM FactSales {filter_sql} GROUP BY month ORDER BY month"), conn)
-        
-        # Top Products (Fixed Logic)
-        prod_sql = f"""
-            SELECT p.Product_Name, SUM(f.Sales_Amount) as total 
-            FROM FactSales f 
-            JOIN (SELECT DISTINCT Product_Key, Product_Name FROM DimProduct) p 
-            ON p.Product_Key LIKE '%' || f.Product_Key 
-            {filter_sql} 
-            GROUP BY p.Product_Name ORDER BY total DESC LIMIT 5
-        """
-        df_prod = pd.read_sql(text(prod_sql), conn)
-        conn.close()
+        sales, orders, df_trend, df_prod = load_dashboard(data_version, selected_year)
 
         # KPI CARDS
         c1, c2 = st.columns(2)
@@ -240,19 +350,14 @@ if selected_page == "Dashboard":
 # >>> PRODUCTS
 elif selected_page == "Products":
     try:
-        conn = engine.connect()
-        # Query product list (logic sama dengan app.py)
-        q = text("""
-            SELECT p.Product_Name, p.Product_Line, IFNULL(SUM(f.Sales_Amount), 0) as sales 
-            FROM (SELECT DISTINCT Product_Key, Product_Name, Product_Line FROM DimProduct) p 
-            LEFT JOIN FactSales f ON p.Product_Key LIKE '%' || f.Product_Key 
-            GROUP BY p.Product_Name ORDER BY sales DESC LIMIT 50
-        """)
-        df = pd.read_sql(q, conn)
-        conn.close()
-        
+        # Query product list (logic sama dengan app.py /api/products_list)
+        page = list_page_controls('products', {
+            'Sales tertinggi': ('sales', 'desc'), 'Sales terendah': ('sales', 'asc'),
+            'Nama A-Z': ('name', 'asc'), 'Nama Z-A': ('name', 'desc'),
+        })
+
         html = f'<div class="table-card"><table class="custom-table"><thead><tr><th>Product Name</th><th>Category</th><th>Total Sales</th></tr></thead><tbody>'
-        for _, r in df.iterrows():
+        for r in page['items']:
             html += f"<tr><td>{r['Product_Name']}</td><td>{r['Product_Line'] or '-'}</td><td>${r['sales']:,.2f}</td></tr>"
         html += '</tbody></table></div>'
         st.markdown(html, unsafe_allow_html=True)
@@ -261,13 +366,14 @@ elif selected_page == "Products":
 # >>> CUSTOMERS
 elif selected_page == "Customers":
     try:
-        conn = engine.connect()
-        df = pd.read_sql("SELECT Customer_ID, First_Name || ' ' || Last_Name as name, 'USA' as country FROM DimCustomer LIMIT 50", conn)
-        conn.close()
+        page = list_page_controls('customers', {
+            'ID': ('id', 'asc'), 'Nama A-Z': ('name', 'asc'),
+            'Nama Z-A': ('name', 'desc'), 'Country': ('country', 'asc'),
+        })
 
         html = f'<div class="table-card"><table class="custom-table"><thead><tr><th>ID</th><th>Name</th><th>Country</th></tr></thead><tbody>'
-        for _, r in df.iterrows():
-            html += f"<tr><td>{r['Customer_ID']}</td><td>{r['name']}</td><td>{r['country']}</td></tr>"
+        for r in page['items']:
+            html += f"<tr><td>{r['id']}</td><td>{r['name']}</td><td>{r['country']}</td></tr>"
         html += '</tbody></table></div>'
         st.markdown(html, unsafe_allow_html=True)
     except Exception as e: st.error(f"Error Customers: {e}")
@@ -0,0 +1,199 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- VALIDASI KUALITAS DATA SALES ---
+# Dijalankan run_etl per chunk sales, setelah transformasi & lookup Product_SK.
+# Setiap aturan = satu mask boolean vektor atas seluruh chunk (tanpa loop per
+# baris). Baris yang melanggar minimal satu aturan tidak dimuat ke FactSales,
+# tetapi ditulis ke QuarantineSales beserta kode alasannya (nilai mentah dari
+# CSV, supaya bisa diperiksa/diperbaiki di sumber).
+QUARANTINE_TABLE = 'QuarantineSales'
+QUARANTINE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {QUARANTINE_TABLE} (
+        Source_Row INTEGER,
+        Order_Number TEXT,
+        Product_Key TEXT,
+        Customer_ID INTEGER,
+        Order_Date TEXT,
+        Ship_Date TEXT,
+        Due_Date TEXT,
+        Sales_Amount REAL,
+        Quantity REAL,
+        Unit_Price REAL,
+        Reason_Codes TEXT NOT NULL,
+        Loaded_At TEXT
+    )
+"""
+QUARANTINE_INDEX = f"CREATE INDEX IF NOT EXISTS idx_quarantine_order ON {QUARANTINE_TABLE} (Order_Number)"
+
+# Kolom mentah sales_details.csv yang disimpan sebelum transformasi (fillna(0)
+# dan parsing tanggal menghilangkan informasi nilai kosong/rusak)
+RAW_COLUMNS = ['sls_order_dt', 'sls_ship_dt', 'sls_due_dt', 'sls_sales', 'sls_quantity', 'sls_price']
+# Selisih yang masih dianggap wajar untuk Sales_Amount vs Quantity x Unit_Price
+SALES_AMOUNT_TOLERANCE = 0.01
+
+def _invalid_date(fact, raw, ctx):
+    # Teks tanggal terisi tapi tidak bisa di-parse (order date wajib ada)
+    invalid = fact['Order_Date'].isna()
+    for raw_col, col in (('sls_ship_dt', 'Ship_Date'), ('sls_due_dt', 'Due_Date')):
+        invalid |= raw[raw_col].notna() & fact[col].isna()
+    return invalid
+
+def _ship_before_order(fact, raw, ctx):
+    return (fact['Ship_Date'] < fact['Order_Date']).fillna(False)
+
+def _missing_amount(fact, raw, ctx):
+    # Kolom yang di-fillna(0) saat transform; price kosong tidak mengubah total
+    return raw[['sls_sales', 'sls_quantity']].isna().any(axis=1)
+
+def _non_positive_amount(fact, raw, ctx):
+    return (raw[['sls_sales', 'sls_quantity', 'sls_price']] <= 0).any(axis=1)
+
+def _sales_mismatch(fact, raw, ctx):
+    # Hanya dicek jika ketiga nilai ada (NaN -> tidak dianggap mismatch)
+    expected = raw['sls_quantity'] * raw['sls_price']
+    return ((raw['sls_sales'] - expected).abs() > SALES_AMOUNT_TOLERANCE).fillna(False)
+
+def _orphan_product(fact, raw, ctx):
+    return fact['Product_SK'].isna()
+
+def _orphan_customer(fact, raw, ctx):
+    # Index customer dibangun sekali (SalesValidator.__init__); hash table-nya di-cache pandas
+    customer_id = fact['Customer_ID'].astype('Int64').fillna(-1).to_numpy(dtype='int64')
+    return pd.Series(ctx['customer_ids'].get_indexer(customer_id) < 0, index=fact.index)
+
+def _duplicate_line(fact, raw, ctx):
+    # Kemunculan pertama yang LOLOS aturan lain (juga dari chunk sebelumnya) dimuat,
+    # kemunculan berikutnya ditolak. Salinan yang ditolak aturan lain tidak dianggap
+    # "sudah dimuat", jadi salinan bersih sesudahnya tetap masuk FactSales.
+    # Key = hash 64-bit (Order_Number, Product_Key): vektor & hemat memori lintas chunk.
+    keys = pd.util.hash_pandas_object(fact[['Order_Number', 'Product_Key']], index=False)
+    passed = ~ctx['rejected']
+    # Ada salinan lolos sebelumnya di chunk ini: cumsum per key (tanpa baris itu
+    # sendiri), hanya untuk key yang muncul lebih dari sekali di chunk
+    repeated = keys.duplicated(keep=False).to_numpy()
+    earlier_in_chunk = np.zeros(len(keys), dtype=bool)
+    if repeated.any():
+        repeated_passed = passed[repeated]
+        passed_count = pd.Series(repeated_passed.astype('int32')).groupby(keys.to_numpy()[repeated]).cumsum()
+        earlier_in_chunk[repeated] = (passed_count.to_numpy() - repeated_passed) > 0
+    duplicate = earlier_in_chunk | ctx['seen_lines'].contains(keys.to_numpy())
+    ctx['seen_lines'].add(keys.to_numpy()[passed & ~duplicate])
+    return pd.Series(duplicate, index=fact.index)
+
+class SeenKeys:
+    """Himpunan key uint64 lintas chunk, disimpan sebagai beberapa array terurut.
+
+    Key chunk baru menjadi array terurut sendiri, lalu digabung dengan array
+    sebelumnya selama array itu tidak lebih besar (seperti counter biner).
+    Tiap key hanya disalin O(log n) kali (tidak menyalin ulang semua key per
+    chunk) dan lookup = searchsorted ke beberapa array. Memori 8 byte per key.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def contains(self, keys):
+        order = np.argsort(keys)
+        ordered = keys[order]
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, ordered), len(run) - 1)
+            found |= run[pos] == ordered
+        result = np.empty(len(keys), dtype=bool)
+        result[order] = found
+        return result
+
+    def add(self, keys):
+        if not len(keys):
+            return
+        self.runs.append(np.sort(keys))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= len(self.runs[-1]):
+            last = self.runs.pop()
+            # kind='stable' (timsort) menggabungkan dua array terurut secara linear
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind='stable')
+
+# (kode alasan, keterangan, fungsi mask) -- urutan = urutan kode di Reason_Codes.
+# DUPLICATE_LINE harus terakhir: memakai hasil semua aturan lain (ctx['rejected']).
+VALIDATION_RULES = [
+    ('INVALID_DATE', "tanggal order/ship/due tidak valid", _invalid_date),
+    ('SHIP_BEFORE_ORDER', "ship date sebelum order date", _ship_before_order),
+    ('MISSING_AMOUNT', "sales/quantity kosong", _missing_amount),
+    ('NON_POSITIVE_AMOUNT', "sales/quantity/price <= 0", _non_positive_amount),
+    ('SALES_MISMATCH', "sales != quantity x price", _sales_mismatch),
+    ('ORPHAN_PRODUCT', "Product_Key tidak ada di DimProduct", _orphan_product),
+    ('ORPHAN_CUSTOMER', "Customer_ID tidak ada di DimCustomer", _orphan_customer),
+    ('DUPLICATE_LINE', "Order_Number + Product_Key ganda", _duplicate_line),
+]
+
+def raw_sales_values(df_sales):
+    """Salinan kolom mentah (dipanggil sebelum transform_sales)"""
+    return df_sales[RAW_COLUMNS].copy()
+
+class SalesValidator:
+    """Menjalankan VALIDATION_RULES per chunk & mengakumulasi jumlah/waktu per aturan"""
+
+    def __init__(self, customer_ids):
+        customer_ids = pd.Index(pd.Series(customer_ids).dropna().astype('int64').unique())
+        customer_ids.get_indexer(customer_ids[:1])  # bangun hash table sekali di sini
+        self.context = {'customer_ids': customer_ids, 'seen_lines': SeenKeys()}
+        self.counts = {code: 0 for code, _, _ in VALIDATION_RULES}
+        self.seconds = {code: 0.0 for code, _, _ in VALIDATION_RULES}
+        self.rows_checked = 0
+        self.rows_rejected = 0
+
+    def validate(self, fact, raw, first_row=0):
+        """Mengembalikan (baris lolos, DataFrame quarantine).
+
+        raw = hasil raw_sales_values() untuk seluruh chunk; fact boleh berupa
+        subset chunk (mode incremental) dengan index yang sama.
+        first_row = nomor baris data pertama chunk ini di file sumber (0-based).
+        """
+        positions = raw.index.get_indexer(fact.index)
+        raw = raw.iloc[positions]
+        masks = {}
+        rejected = np.zeros(len(fact), dtype=bool)
+        for code, _, rule in VALIDATION_RULES:
+            # Baris yang sudah ditolak aturan sebelumnya (dipakai _duplicate_line)
+            self.context['rejected'] = rejected
+            start = time.perf_counter()
+            mask = rule(fact, raw, self.context).to_numpy(dtype=bool)
+            self.seconds[code] += time.perf_counter() - start
+            self.counts[code] += int(mask.sum())
+            masks[code] = mask
+            rejected = rejected | mask
+
+        self.rows_checked += len(fact)
+        self.rows_rejected += int(rejected.sum())
+        if not rejected.any():
+            return fact, None
+
+        # Kode alasan hanya dirangkai untuk baris yang ditolak (biasanya sedikit)
+        reasons = pd.Series('', index=fact.index[rejected])
+        for code, mask in masks.items():
+            hit = mask[rejected]
+            reasons[hit] += ',' + code
+        quarantine = pd.DataFrame({
+            'Source_Row': positions[rejected] + first_row + 1,
+            'Order_Number': fact['Order_Number'].to_numpy()[rejected],
+            'Product_Key': fact['Product_Key'].astype(str).to_numpy()[rejected],
+            'Customer_ID': fact['Customer_ID'].to_numpy()[rejected],
+            'Order_Date': raw['sls_order_dt'].to_numpy()[rejected],
+            'Ship_Date': raw['sls_ship_dt'].to_numpy()[rejected],
+            'Due_Date': raw['sls_due_dt'].to_numpy()[rejected],
+            'Sales_Amount': raw['sls_sales'].to_numpy()[rejected],
+            'Quantity': raw['sls_quantity'].to_numpy()[rejected],
+            'Unit_Price': raw['sls_price'].to_numpy()[rejected],
+            'Reason_Codes': reasons.str[1:].to_numpy(),
+        })
+        return fact[~rejected], quarantine
+
+    def report(self):
+        print("\n=== LAPORAN VALIDASI DATA SALES ===")
+        for code, description, _ in VALIDATION_RULES:
+            print(f"   {code:<20} {self.counts[code]:8d} baris  {self.seconds[code] * 1000:8.2f} ms  ({description})")
+        total_ms = sum(self.seconds.values()) * 1000
+        print(f"   {'TOTAL':<20} {self.rows_rejected:8d} dari {self.rows_checked} baris ditolak "
+              f"-> {QUARANTINE_TABLE}  ({total_ms:.2f} ms)")
@@ -0,0 +1,178 @@
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Load test: N klien bersamaan (koneksi keep-alive) memutar daftar URL dashboard.
+#   python app_async.py --port 8000 &            (atau: python app.py -> port 5000)
+#   python load_test.py --url http://127.0.0.1:8000 --clients 64 --duration 10
+#   python load_test.py --spawn --clients 64      (jalankan app_async.py sendiri)
+# Hanya butuh pustaka standar (asyncio), klien HTTP/1.1 minimal di bawah.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Campuran request seperti pengguna index.html: ganti tahun, buka list, cari.
+# {year} diisi bergantian dari /api/years.
+DEFAULT_PATHS = [
+    '/api/data?year=All',
+    '/api/data?year={year}',
+    '/api/products_list?sort=sales&order=desc',
+    '/api/customers_list?sort=id&order=asc',
+    '/api/customers_list?sort=name&order=asc&q=Jo',
+    '/api/products_list?sort=name&order=asc&q=Mountain',
+]
+
+class HttpConnection:
+    """Satu koneksi keep-alive; cukup untuk response Content-Length dari app"""
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def get(self, path, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Accept-Encoding: gzip"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("koneksi ditutup server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        body = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, response_headers, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+async def client_loop(client_no, host, port, paths, deadline, results):
+    conn = HttpConnection(host, port)
+    i = client_no  # tiap klien mulai dari URL berbeda
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, headers, _ = await conn.get(path)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            results['errors'] += 1
+            conn.close()
+            continue
+        results['latency_ms'].append((time.perf_counter() - start) * 1000)
+        results['status'][status] = results['status'].get(status, 0) + 1
+        results['coalesced'] += headers.get('x-coalesced') == '1'
+        cache = headers.get('x-cache', '-')
+        results['cache'][cache] = results['cache'].get(cache, 0) + 1
+    conn.close()
+
+async def expand_paths(host, port, paths):
+    """Isi {year} dengan semua tahun dari /api/years (satu path per tahun)"""
+    conn = HttpConnection(host, port)
+    _, headers, body = await conn.get('/api/years')
+    conn.close()
+    if headers.get('content-encoding') == 'gzip':
+        body = gzip.decompress(body)
+    years = json.loads(body) or ['All']
+    expanded = []
+    for path in paths:
+        if '{year}' in path:
+            expanded.extend(path.format(year=year) for year in years)
+        else:
+            expanded.append(path)
+    return expanded
+
+async def run_load_test(url, clients, duration, paths):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    paths = await expand_paths(host, port, paths)
+    results = {'latency_ms': [], 'status': {}, 'cache': {}, 'errors': 0, 'coalesced': 0}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client_loop(n, host, port, paths, deadline, results) for n in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latency = sorted(results['latency_ms'])
+    summary = {
+        'url': url, 'clients': clients, 'duration_s': round(elapsed, 2),
+        'requests': len(latency), 'errors': results['errors'],
+        'throughput_rps': round(len(latency) / elapsed, 1),
+        'status': results['status'], 'cache': results['cache'], 'coalesced': results['coalesced'],
+    }
+    if latency:
+        summary.update(p50_ms=round(statistics.median(latency), 2),
+                       p95_ms=round(latency[int(0.95 * (len(latency) - 1))], 2),
+                       p99_ms=round(latency[int(0.99 * (len(latency) - 1))], 2),
+                       max_ms=round(latency[-1], 2))
+    return summary
+
+async def wait_for_server(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            writer.close()
+            return True
+        except OSError:
+            await asyncio.sleep(0.2)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test endpoint dashboard dengan banyak klien bersamaan")
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="Alamat server (app_async.py / app.py)")
+    parser.add_argument('--clients', type=int, default=64, help="Jumlah klien bersamaan (default 64)")
+    parser.add_argument('--duration', type=float, default=10, help="Lama test dalam detik")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help="URL yang diputar tiap klien")
+    parser.add_argument('--spawn', action='store_true', help="Jalankan app_async.py di port --url selama test")
+    parser.add_argument('--workers', type=int, default=None, help="Diteruskan ke app_async.py (dengan --spawn)")
+    parser.add_argument('--output', default=None, help="Simpan ringkasan sebagai JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        cmd = [sys.executable, os.path.join(SCRIPT_DIR, 'app_async.py'),
+               '--port', str(urlsplit(args.url).port or 80)]
+        if args.workers:
+            cmd += ['--workers', str(args.workers)]
+        server = subprocess.Popen(cmd, cwd=SCRIPT_DIR)
+    try:
+        if not asyncio.run(wait_for_server(args.url)):
+            raise SystemExit(f"!!! Server tidak merespons di {args.url}")
+        print(f">>> Load test {args.url}: {args.clients} klien, {args.duration:.0f} s")
+        summary = asyncio.run(run_load_test(args.url, args.clients, args.duration, args.paths))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"   Request    : {summary['requests']} ({summary['errors']} error)")
+    print(f"   Throughput : {summary['throughput_rps']} req/s")
+    if summary['requests']:
+        print(f"   Latency    : p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+              f"p99 {summary['p99_ms']} ms, max {summary['max_ms']} ms")
+    print(f"   Status     : {summary['status']}  Cache: {summary['cache']}  Digabung: {summary['coalesced']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f">>> Ringkasan ditulis ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import os
+import shutil
+
+import pandas as pd
+
+# pyarrow opsional: hanya dibutuhkan jika store Parquet dipakai
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# --- STORE KOLOMNAR PARQUET ---
+# Salinan kolomnar warehouse SQLite untuk query analitik dashboard:
+#   <store>/FactSales/Order_Year=2013/part-0.parquet   (partisi hive per tahun order)
+#   <store>/DimProduct.parquet, <store>/DimCustomer.parquet
+#   <store>/_version                                   (versi warehouse = PRAGMA user_version)
+# Filter tahun hanya membuka folder partisi tahun itu, dan hanya kolom yang
+# dibutuhkan yang dibaca dari file (column pruning).
+# Lokasi dibaca dari env di sini supaya ETL (tulis/hapus) & frontend sepakat.
+DEFAULT_STORE_DIR = os.environ.get('SALESREPORT_PARQUET_DIR',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parquet_store'))
+FACT_DIR = 'FactSales'
+VERSION_FILE = '_version'
+PARTITION_COLUMN = 'Order_Year'
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+EXPORT_BATCH_SIZE = 100_000
+
+DATE_COLUMNS = {
+    'FactSales': ['Order_Date', 'Ship_Date', 'Due_Date'],
+    'DimProduct': ['Start_Date', 'End_Date'],
+    'DimCustomer': ['Birthdate', 'Create_Date'],
+}
+FACT_SCHEMA = [
+    ('Order_Number', 'string'), ('Product_Key', 'string'), ('Product_SK', 'int64'),
+    ('Customer_ID', 'int64'), ('Order_Date', 'date32'), ('Ship_Date', 'date32'),
+    ('Due_Date', 'date32'), ('Order_Year', 'int16'), ('Order_Month', 'int8'),
+    ('Sales_Amount', 'float64'), ('Quantity', 'int32'), ('Unit_Price', 'float64'),
+]
+
+def pyarrow_available():
+    return pa is not None
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Store Parquet membutuhkan pyarrow (pip install pyarrow)")
+
+def fact_schema():
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in FACT_SCHEMA])
+
+def partition_name(year):
+    """Nama folder partisi hive; tahun NULL (tanggal order invalid) -> partisi default"""
+    return f"{PARTITION_COLUMN}={NULL_PARTITION if year is None else year}"
+
+def partitioning():
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int16())]), flavor='hive')
+
+def _to_batch(df, table, schema=None):
+    """DataFrame hasil SELECT SQLite -> RecordBatch (tanggal teks -> date32)"""
+    for col in DATE_COLUMNS.get(table, []):
+        df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
+    return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+
+# --- EXPORT (DIPANGGIL run_etl) ---
+def export_parquet_store(conn, store_dir=DEFAULT_STORE_DIR):
+    """Tulis ulang store Parquet dari warehouse SQLite (koneksi sqlite3).
+
+    Ditulis ke folder sementara lalu di-rename, jadi pembaca tidak melihat
+    store setengah jadi. Mengembalikan jumlah baris FactSales yang ditulis.
+    """
+    require_pyarrow()
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    # FactSales: dibaca per batch dari SQLite, tiap batch dipecah per tahun dan
+    # ditambahkan ke file partisinya (satu ParquetWriter per tahun). Kolom
+    # Order_Year tidak disimpan di file: nilainya ada di nama folder partisi.
+    schema = fact_schema()
+    file_schema = schema.remove(schema.get_field_index(PARTITION_COLUMN))
+    writers = {}
+    rows = 0
+    try:
+        for chunk in pd.read_sql_query(f"SELECT {', '.join(schema.names)} FROM FactSales", conn,
+                                       chunksize=EXPORT_BATCH_SIZE):
+            rows += len(chunk)
+            batch = pa.Table.from_batches([_to_batch(chunk, 'FactSales', schema)])
+            years = batch[PARTITION_COLUMN]
+            for year in pc.unique(years).to_pylist():
+                mask = pc.is_null(years) if year is None else pc.equal(years, year)
+                part = batch.filter(mask).drop_columns([PARTITION_COLUMN])
+                if year not in writers:
+                    part_dir = os.path.join(tmp_dir, FACT_DIR, partition_name(year))
+                    os.makedirs(part_dir)
+                    writers[year] = pq.ParquetWriter(os.path.join(part_dir, 'part-0.parquet'), file_schema)
+                writers[year].write_table(part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Dimensi kecil: satu file per tabel
+    for table in ('DimProduct', 'DimCustomer'):
+        df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+        pq.write_table(pa.Table.from_batches([_to_batch(df, table)]),
+                       os.path.join(tmp_dir, f'{table}.parquet'))
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    with open(os.path.join(tmp_dir, VERSION_FILE), 'w') as f:
+        f.write(str(version))
+
+    old_dir = store_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.rename(store_dir, old_dir)
+    os.rename(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return rows
+
+def clear_store(store_dir=DEFAULT_STORE_DIR):
+    """Hapus store lama (dipanggil ETL saat load tanpa --parquet supaya backend
+    parquet tidak membaca data basi)"""
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+        return True
+    return False
+
+# --- QUERY BACKEND (DIPANGGIL app.py & dashboard.py) ---
+def store_version(store_dir=DEFAULT_STORE_DIR):
+    """Versi warehouse saat store ditulis (None jika store belum ada)"""
+    try:
+        with open(os.path.join(store_dir, VERSION_FILE)) as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return None
+
+def fact_dataset(store_dir=DEFAULT_STORE_DIR):
+    require_pyarrow()
+    return ds.dataset(os.path.join(store_dir, FACT_DIR), format='parquet', partitioning=partitioning())
+
+def parquet_years(store_dir=DEFAULT_STORE_DIR):
+    """Tahun yang tersedia, dibaca dari nama folder partisi (tanpa membaca data)"""
+    years = []
+    for name in os.listdir(os.path.join(store_dir, FACT_DIR)):
+        key, _, value = name.partition('=')
+        if key == PARTITION_COLUMN and value.isdigit():
+            years.append(int(value))
+    return sorted(years, reverse=True)
+
+def parquet_dashboard_rows(year, store_dir=DEFAULT_STORE_DIR):
+    """Trend bulanan & top 5 produk, bentuk sama dengan query SQLite di app.py.
+
+    year = int (hanya partisi tahun itu yang dibaca) atau 'All'.
+    Mengembalikan (trend, products):
+      trend    = [(Year_Month, Total_Sales, Total_Orders), ...] urut bulan
+      products = [(Product_Name, Total_Sales), ...] maksimal 5, urut sales
+    """
+    dataset = fact_dataset(store_dir)
+    row_filter = None if year == 'All' else ds.field(PARTITION_COLUMN) == year
+    fact = dataset.to_table(columns=['Order_Year', 'Order_Month', 'Product_SK', 'Sales_Amount'],
+                            filter=row_filter)
+
+    # Trend bulanan (NULL tahun = tanggal order invalid, label None seperti di SQLite)
+    monthly = (fact.group_by(['Order_Year', 'Order_Month'])
+               .aggregate([('Sales_Amount', 'sum'), ('Sales_Amount', 'count')])
+               .to_pylist())
+    trend = []
+    for row in monthly:
+        label = None
+        if row['Order_Year'] is not None:
+            label = f"{row['Order_Year']:04d}-{row['Order_Month']:02d}"
+        trend.append((label, row['Sales_Amount_sum'], row['Sales_Amount_count']))
+    trend.sort(key=lambda r: (r[0] is not None, r[0] or ''))
+
+    # Top 5 produk: sum per Product_SK, lalu gabung per nama versi aktif produk
+    # (SCD type 2: semua versi Product_Key dihitung di bawah nama Is_Current = 1)
+    per_sk = fact.group_by('Product_SK').aggregate([('Sales_Amount', 'sum')])
+    versions = pq.read_table(os.path.join(store_dir, 'DimProduct.parquet'),
+                             columns=['Product_SK', 'Product_Key', 'Product_Name', 'Is_Current'])
+    current = versions.filter(pc.equal(versions['Is_Current'], 1)).select(['Product_Key', 'Product_Name'])
+    products = versions.select(['Product_SK', 'Product_Key']).join(current, 'Product_Key', join_type='inner')
+    per_name = (per_sk.join(products, 'Product_SK', join_type='inner')
+                .group_by('Product_Name')
+                .aggregate([('Sales_Amount_sum', 'sum')])
+                .sort_by([('Sales_Amount_sum_sum', 'descending'), ('Product_Name', 'ascending')])
+                .slice(0, 5))
+    top = list(zip(per_name['Product_Name'].to_pylist(), per_name['Sales_Amount_sum_sum'].to_pylist()))
+    return trend, top
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_quality import SalesValidator, SeenKeys, VALIDATION_RULES, raw_sales_values
+from ETL_pipeline import (SALES_DTYPES, StageTimer, build_dim_product, build_product_lookup,
+                          coerce_sales_types, resolve_product_sk, transform_sales)
+
+CUSTOMER_IDS = [11000, 11001]
+PRD_INFO = pd.DataFrame({
+    'prd_id': [210, 211], 'prd_key': ['BI-RB-BK-R93R-62', 'AC-HE-HL-U509'],
+    'prd_nm': ['Road-150 Red- 62', 'Sport-100 Helmet- Red'], 'prd_cost': [2171, 12],
+    'prd_line': ['R', 'S'], 'prd_start_dt': ['2011-07-01', '2012-07-01'], 'prd_end_dt': [None, None],
+})
+LOOKUP = build_product_lookup(build_dim_product(PRD_INFO))
+
+# Baris bersih; kasus di bawah mengubah satu nilai supaya melanggar tepat satu aturan
+CLEAN = {'sls_ord_num': 'SO43697', 'sls_prd_key': 'BK-R93R-62', 'sls_cust_id': '11000',
+         'sls_order_dt': '20130101', 'sls_ship_dt': '20130108', 'sls_due_dt': '20130113',
+         'sls_sales': '3578', 'sls_quantity': '1', 'sls_price': '3578'}
+ONE_REASON_ROWS = [
+    ('INVALID_DATE', {'sls_ord_num': 'SO1', 'sls_ship_dt': '2013x108'}),
+    ('SHIP_BEFORE_ORDER', {'sls_ord_num': 'SO2', 'sls_ship_dt': '20121231'}),
+    ('MISSING_AMOUNT', {'sls_ord_num': 'SO3', 'sls_quantity': None}),
+    ('NON_POSITIVE_AMOUNT', {'sls_ord_num': 'SO4', 'sls_sales': '-3578', 'sls_quantity': '-1'}),
+    ('SALES_MISMATCH', {'sls_ord_num': 'SO5', 'sls_sales': '3000'}),
+    ('ORPHAN_PRODUCT', {'sls_ord_num': 'SO6', 'sls_prd_key': 'XX-UNKNOWN'}),
+    ('ORPHAN_CUSTOMER', {'sls_ord_num': 'SO7', 'sls_cust_id': '99999'}),
+    ('DUPLICATE_LINE', {}),  # sama persis dengan baris bersih pertama
+]
+
+def sales_chunk(rows, first_row=0):
+    """Chunk seperti hasil iter_sales_chunks (teks -> SALES_DTYPES, index = nomor baris file)"""
+    df = pd.DataFrame([{**CLEAN, **row} for row in rows], columns=list(SALES_DTYPES),
+                      index=range(first_row, first_row + len(rows)))
+    df = coerce_sales_types(df)
+    raw = raw_sales_values(df)
+    fact = transform_sales(df, StageTimer())
+    fact['Product_SK'] = resolve_product_sk(fact, LOOKUP)
+    return fact, raw
+
+def test_rules_cover_every_reason_code():
+    assert [code for code, _, _ in VALIDATION_RULES] == [code for code, _ in ONE_REASON_ROWS]
+
+def test_one_row_per_reason_code():
+    fact, raw = sales_chunk([{}] + [row for _, row in ONE_REASON_ROWS], first_row=100)
+    validator = SalesValidator(pd.Series(CUSTOMER_IDS + [None]))
+    clean, quarantine = validator.validate(fact, raw, first_row=100)
+
+    assert clean['Order_Number'].tolist() == ['SO43697']
+    assert quarantine['Reason_Codes'].tolist() == [code for code, _ in ONE_REASON_ROWS]
+    # Source_Row = nomor baris data di file (1-based), nilai mentah disimpan apa adanya
+    assert quarantine['Source_Row'].tolist() == list(range(102, 102 + len(ONE_REASON_ROWS)))
+    assert quarantine.set_index('Reason_Codes').loc['INVALID_DATE', 'Ship_Date'] == '2013x108'
+    assert pd.isna(quarantine.set_index('Reason_Codes').loc['MISSING_AMOUNT', 'Quantity'])
+    assert validator.counts == {code: 1 for code, _ in ONE_REASON_ROWS}
+    assert (validator.rows_checked, validator.rows_rejected) == (9, 8)
+
+def test_multiple_reason_codes_in_rule_order():
+    fact, raw = sales_chunk([{'sls_prd_key': 'XX-UNKNOWN', 'sls_sales': '0', 'sls_cust_id': '99999'}])
+    _, quarantine = SalesValidator(CUSTOMER_IDS).validate(fact, raw)
+    assert quarantine['Reason_Codes'].tolist() == ['NON_POSITIVE_AMOUNT,SALES_MISMATCH,ORPHAN_PRODUCT,ORPHAN_CUSTOMER']
+
+def test_clean_chunk_has_no_quarantine():
+    fact, raw = sales_chunk([{}, {'sls_prd_key': 'HL-U509'}, {'sls_ord_num': 'SO43698'}])
+    clean, quarantine = SalesValidator(CUSTOMER_IDS).validate(fact, raw)
+    assert quarantine is None
+    assert len(clean) == 3
+
+def test_duplicates_across_chunks():
+    validator = SalesValidator(CUSTOMER_IDS)
+    chunks = [
+        [{'sls_ord_num': 'SO1'}, {'sls_ord_num': 'SO2'}],
+        [{'sls_ord_num': 'SO3'}, {'sls_ord_num': 'SO1'}, {'sls_ord_num': 'SO1', 'sls_prd_key': 'HL-U509'}],
+        [{'sls_ord_num': 'SO2'}, {'sls_ord_num': 'SO4'}, {'sls_ord_num': 'SO4'}],
+        [{'sls_ord_num': 'SO3'}, {'sls_ord_num': 'SO1', 'sls_prd_key': 'HL-U509'}],
+    ]
+    loaded, rejected, first_row = [], [], 0
+    for rows in chunks:
+        fact, raw = sales_chunk(rows, first_row)
+        clean, quarantine = validator.validate(fact, raw, first_row)
+        loaded += list(zip(clean['Order_Number'], clean['Product_Key'].astype(str)))
+        if quarantine is not None:
+            assert set(quarantine['Reason_Codes']) == {'DUPLICATE_LINE'}
+            rejected += quarantine['Source_Row'].tolist()
+        first_row += len(rows)
+    # Kemunculan pertama dimuat (juga jika duplikatnya ada di chunk lain), sisanya ditolak
+    assert loaded == [('SO1', 'BK-R93R-62'), ('SO2', 'BK-R93R-62'), ('SO3', 'BK-R93R-62'),
+                      ('SO1', 'HL-U509'), ('SO4', 'BK-R93R-62')]
+    assert rejected == [4, 6, 8, 9, 10]
+
+@pytest.mark.parametrize('split', [False, True])
+def test_rejected_copy_does_not_block_clean_copy(split):
+    # Salinan pertama ditolak aturan lain -> salinan bersih berikutnya tetap dimuat;
+    # salinan rusak SETELAH salinan bersih tetap ditandai DUPLICATE_LINE
+    rows = [{'sls_cust_id': '99999'}, {'sls_sales': '1'}, {}, {}, {'sls_cust_id': '99999'}]
+    chunks = [rows[:2], rows[2:]] if split else [rows]
+    validator = SalesValidator(CUSTOMER_IDS)
+    loaded, reasons, first_row = 0, {}, 0
+    for chunk in chunks:
+        clean, quarantine = validator.validate(*sales_chunk(chunk, first_row), first_row=first_row)
+        loaded += len(clean)
+        if quarantine is not None:
+            reasons.update(zip(quarantine['Source_Row'], quarantine['Reason_Codes']))
+        first_row += len(chunk)
+    assert loaded == 1
+    assert reasons == {1: 'ORPHAN_CUSTOMER', 2: 'SALES_MISMATCH', 4: 'DUPLICATE_LINE',
+                       5: 'ORPHAN_CUSTOMER,DUPLICATE_LINE'}
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 500])
+def test_seen_keys_matches_python_set(chunk_size):
+    keys = np.random.default_rng(0).integers(0, 3000, size=5000).astype('uint64')
+    seen, expected = SeenKeys(), set()
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        assert seen.contains(chunk).tolist() == [int(k) in expected for k in chunk]
+        new = np.unique(chunk[~seen.contains(chunk)])
+        seen.add(new)
+        expected.update(int(k) for k in new)
+    assert sum(len(run) for run in seen.runs) == len(expected)
+    # Jumlah array terurut tetap O(log n), bukan satu per chunk
+    assert len(seen.runs) <= int(np.log2(len(expected))) + 1
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from ETL_pipeline import build_dim_product, build_product_lookup, resolve_product_sk
+
+# Dua produk: BK-R93R-62 punya dua versi (harga naik 2013-07-01), HL-U509 satu versi.
+# prd_id sengaja tidak urut tanggal supaya Product_SK != urutan versi.
+PRD_INFO = pd.DataFrame({
+    'prd_id': [212, 210, 211],
+    'prd_key': ['BI-RB-BK-R93R-62', 'BI-RB-BK-R93R-62', 'AC-HE-HL-U509'],
+    'prd_nm': ['Road-150 Red- 62', 'Road-150 Red- 62', 'Sport-100 Helmet- Red'],
+    'prd_cost': [2171, 2100, 12],
+    'prd_line': ['R ', 'R ', 'S '],
+    'prd_start_dt': ['2013-07-01', '2011-07-01', '2012-07-01'],
+    'prd_end_dt': [None, '2012-06-28', None],
+})
+
+@pytest.fixture(scope='module')
+def dim_product():
+    return build_dim_product(PRD_INFO)
+
+@pytest.fixture(scope='module')
+def lookup(dim_product):
+    return build_product_lookup(dim_product)
+
+def sk(dim_product, product_key, start_date):
+    row = dim_product[(dim_product['Product_Key'] == product_key)
+                      & (dim_product['Start_Date'] == pd.Timestamp(start_date))]
+    return int(row['Product_SK'].iloc[0])
+
+def resolve(lookup, rows, categorical=False):
+    fact = pd.DataFrame(rows, columns=['Product_Key', 'Order_Date'])
+    fact['Order_Date'] = pd.to_datetime(fact['Order_Date'])
+    if categorical:
+        fact['Product_Key'] = fact['Product_Key'].astype('category')
+    return resolve_product_sk(fact, lookup).tolist()
+
+def test_dim_product_version_ranges(dim_product):
+    versions = dim_product.sort_values(['Product_Key', 'Start_Date']).set_index('Product_ID')
+    assert versions.loc[210, 'End_Date'] == pd.Timestamp('2013-06-30')
+    assert pd.isna(versions.loc[212, 'End_Date'])
+    assert versions['Is_Current'].to_dict() == {210: 0, 212: 1, 211: 1}
+
+@pytest.mark.parametrize('categorical', [False, True])
+def test_resolve_product_sk_cases(dim_product, lookup, categorical):
+    old = sk(dim_product, 'BK-R93R-62', '2011-07-01')
+    new = sk(dim_product, 'BK-R93R-62', '2013-07-01')
+    helmet = sk(dim_product, 'HL-U509', '2012-07-01')
+    rows = [
+        ('BK-R93R-62', '2010-12-29'),  # sebelum versi pertama -> versi paling awal
+        ('BK-R93R-62', '2011-07-01'),  # tepat Start_Date versi pertama
+        ('BK-R93R-62', '2013-06-30'),  # End_Date versi lama (sehari sebelum batas)
+        ('BK-R93R-62', '2013-07-01'),  # tepat di batas -> versi baru
+        ('BK-R93R-62', '2014-01-28'),  # setelah versi terakhir
+        ('BK-R93R-62', None),          # NaT -> versi paling awal
+        ('HL-U509', '2011-01-01'),     # sebelum satu-satunya versi
+        ('HL-U509', None),
+        ('XX-UNKNOWN', '2013-07-01'),  # Product_Key tidak dikenal -> <NA>
+        ('XX-UNKNOWN', None),
+    ]
+    assert resolve(lookup, rows, categorical) == [old, old, old, new, new, old, helmet, helmet, pd.NA, pd.NA]
+
+def test_resolve_product_sk_keeps_index(lookup):
+    fact = pd.DataFrame({'Product_Key': ['HL-U509', 'XX-UNKNOWN'],
+                         'Order_Date': pd.to_datetime(['2013-01-01', '2013-01-01'])}, index=[40, 7])
+    result = resolve_product_sk(fact, lookup)
+    assert result.dtype == 'Int64'
+    assert result.index.tolist() == [40, 7]
+    assert result.isna().tolist() == [False, True]
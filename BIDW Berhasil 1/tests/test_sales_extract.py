@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from data_quality import SalesValidator, raw_sales_values
+from ETL_pipeline import (StageTimer, build_dim_product, build_product_lookup, iter_sales_chunks,
+                          resolve_product_sk, transform_sales)
+
+PRD_INFO = pd.DataFrame({
+    'prd_id': [210], 'prd_key': ['BI-RB-BK-R93R-62'], 'prd_nm': ['Road-150 Red- 62'],
+    'prd_cost': [2171], 'prd_line': ['R'], 'prd_start_dt': ['2011-07-01'], 'prd_end_dt': [None],
+})
+LOOKUP = build_product_lookup(build_dim_product(PRD_INFO))
+HEADER = "sls_ord_num,sls_prd_key,sls_cust_id,sls_order_dt,sls_ship_dt,sls_due_dt,sls_sales,sls_quantity,sls_price\n"
+# Customer ID kotor: pecahan, di luar range Int32 (dulu overflow jadi 1410065407), teks, kosong
+BAD_IDS = ['11000.5', '9999999999', '1410065407', 'abc', '']
+
+def sales_file(tmp_path, dirty_amount):
+    lines = [f"SO{i},BK-R93R-62,{cust},20130101,20130108,20130113,3578,1,3578\n"
+             for i, cust in enumerate(['11000', '11001'] + BAD_IDS + ['11000'])]
+    if dirty_amount:
+        # Nilai non-numerik di kolom sales -> path full memakai fallback teks
+        lines[1] = lines[1].replace(',3578,1,', ',n/a,1,')
+    path = tmp_path / 'sales_details.csv'
+    path.write_text(HEADER + ''.join(lines), encoding='latin1')
+    return path
+
+def run_validation(path, chunksize):
+    """Extract -> transform -> lookup -> validasi seperti run_etl; (baris lolos, quarantine)"""
+    timer = StageTimer()
+    validator = SalesValidator([11000, 11001, 1410065407])
+    clean, rejects, total_rows = [], [], 0
+    for df_sales in iter_sales_chunks(path, chunksize, timer):
+        first_row = total_rows
+        total_rows += len(df_sales)
+        raw_sales = raw_sales_values(df_sales)
+        fact_sales = transform_sales(df_sales, timer)
+        fact_sales['Product_SK'] = resolve_product_sk(fact_sales, LOOKUP)
+        fact_sales, quarantine = validator.validate(fact_sales, raw_sales, first_row)
+        clean.append(fact_sales)
+        if quarantine is not None:
+            rejects.append(quarantine)
+    return pd.concat(clean), pd.concat(rejects, ignore_index=True)
+
+@pytest.mark.parametrize('dirty_amount', [False, True])
+def test_bad_customer_ids_quarantined_in_full_and_chunked_mode(tmp_path, dirty_amount):
+    path = sales_file(tmp_path, dirty_amount)
+    clean_full, rejects_full = run_validation(path, None)
+    for chunksize in (1, 3):
+        clean_chunked, rejects_chunked = run_validation(path, chunksize)
+        pd.testing.assert_frame_equal(rejects_chunked, rejects_full)
+        assert clean_chunked['Order_Number'].tolist() == clean_full['Order_Number'].tolist()
+
+    orphans = rejects_full[rejects_full['Reason_Codes'].str.contains('ORPHAN_CUSTOMER')]
+    # Semua ID kotor ditolak (bukan crash / menempel ke customer 1410065407), kecuali ID valid itu sendiri
+    assert orphans['Order_Number'].tolist() == ['SO2', 'SO3', 'SO5', 'SO6']
+    assert orphans['Customer_ID'].isna().all()
+    assert 'SO4' in clean_full['Order_Number'].tolist()
+    assert clean_full['Customer_ID'].dtype == 'Int32'
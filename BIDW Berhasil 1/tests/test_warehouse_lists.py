@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from ETL_pipeline import AGGREGATE_INDEXES, WAREHOUSE_INDEXES, WAREHOUSE_SCHEMA
+from warehouse_lists import LIST_MAX_PAGE_SIZE, LISTS, encode_cursor, query_list_page
+
+# Data sengaja penuh nilai kembar (sales, nama, negara) dan beda huruf besar/kecil,
+# supaya tiebreak key & COLLATE NOCASE ikut teruji di batas halaman
+PRODUCTS = [(f"{'mountain' if i % 3 else 'Mountain'}-{i % 7}{i}", 'M' if i % 2 else 'R',
+             [0.0, 150.5, 150.5, 2000.0][i % 4]) for i in range(23)]
+CUSTOMERS = [(i, ['Jon Yang', 'jon yang', 'Eugene Huang', 'Ruben Torres'][i % 4] if i % 5 else 'Ana',
+              ['Germany', 'United States', 'Australia'][i % 3]) for i in range(11000, 11031)]
+
+@pytest.fixture
+def conn():
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE AggProductSales (Product_Name TEXT, Product_Line TEXT, Total_Sales REAL)"))
+        conn.execute(text(WAREHOUSE_SCHEMA['DimCustomer'].format(name='DimCustomer')))
+        conn.execute(text("INSERT INTO AggProductSales VALUES (:name, :line, :sales)"),
+                     [{'name': n, 'line': l, 'sales': s} for n, l, s in PRODUCTS])
+        conn.execute(text("INSERT INTO DimCustomer (Customer_ID, Full_Name, Country) VALUES (:id, :name, :country)"),
+                     [{'id': i, 'name': n, 'country': c} for i, n, c in CUSTOMERS])
+        for ddl in AGGREGATE_INDEXES + WAREHOUSE_INDEXES:
+            if 'AggProductSales' in ddl or 'DimCustomer' in ddl:
+                conn.execute(text(ddl))
+        yield conn
+
+def walk(conn, name, sort, order, limit, q=None):
+    """Semua halaman list dengan mengikuti next_cursor"""
+    items, cursor = [], None
+    while True:
+        page = query_list_page(conn, name, sort=sort, order=order, q=q, cursor=cursor, limit=limit)
+        assert len(page['items']) <= limit
+        items.extend(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return items
+
+KEY_FIELD = {'products': 'Product_Name', 'customers': 'id'}
+CASES = [(name, sort, order) for name in LISTS for sort in LISTS[name]['sorts'] for order in ('asc', 'desc')]
+
+@pytest.mark.parametrize('name, sort, order', CASES)
+@pytest.mark.parametrize('limit', [1, 4, 7])
+def test_cursor_walk_no_duplicates_or_gaps(conn, name, sort, order, limit):
+    # Satu halaman besar = urutan acuan; cursor walk harus identik (tanpa duplikat/celah)
+    expected = query_list_page(conn, name, sort=sort, order=order, limit=LIST_MAX_PAGE_SIZE)['items']
+    assert len(expected) == len(PRODUCTS if name == 'products' else CUSTOMERS)
+    items = walk(conn, name, sort, order, limit)
+    keys = [item[KEY_FIELD[name]] for item in items]
+    assert len(keys) == len(set(keys))
+    assert items == expected
+
+@pytest.mark.parametrize('name, sort, order', CASES)
+def test_cursor_walk_with_prefix_search(conn, name, sort, order):
+    field = 'Product_Name' if name == 'products' else 'name'
+    items = walk(conn, name, sort, order, limit=2, q='JON' if name == 'customers' else 'mountain-3')
+    prefix = 'jon' if name == 'customers' else 'mountain-3'
+    expected = query_list_page(conn, name, sort=sort, order=order, q=prefix, limit=LIST_MAX_PAGE_SIZE)['items']
+    assert items == expected
+    assert items and all(item[field].lower().startswith(prefix) for item in items)
+
+def test_sort_order_follows_sort_column(conn):
+    items = walk(conn, 'products', 'sales', 'desc', limit=3)
+    sales = [item['sales'] for item in items]
+    assert sales == sorted(sales, reverse=True)
+    items = walk(conn, 'customers', 'name', 'asc', limit=3)
+    names = [item['name'].lower() for item in items]
+    assert names == sorted(names)
+
+def test_last_page_has_no_cursor(conn):
+    page = query_list_page(conn, 'customers', limit=len(CUSTOMERS))
+    assert len(page['items']) == len(CUSTOMERS)
+    assert page['next_cursor'] is None
+    # Cursor di baris terakhir -> halaman kosong, bukan kembali ke awal
+    last = page['items'][-1]
+    page = query_list_page(conn, 'customers', cursor=encode_cursor(last['id'], last['id']))
+    assert page == {'items': [], 'next_cursor': None}
+
+@pytest.mark.parametrize('cursor', ['!!!', 'bm90LWpzb24', encode_cursor(1, 2)[:-3] + '***'])
+def test_malformed_cursor_raises_value_error(conn, cursor):
+    with pytest.raises(ValueError):
+        query_list_page(conn, 'products', cursor=cursor)
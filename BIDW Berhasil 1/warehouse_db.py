@@ -0,0 +1,65 @@
+from sqlalchemy import create_engine, event, pool
+import pathlib
+import sqlite3
+
+# --- KONEKSI READ-ONLY UNTUK FRONTEND (app.py & dashboard.py) ---
+# Satu pool koneksi SQLite read-only (mode=ro + query_only) yang dipakai ulang
+# antar request/rerun, jadi skema & statement cache tidak dibaca ulang setiap
+# query. Database memakai WAL (diset ETL), sehingga pembaca tidak pernah
+# "database is locked" saat ETL menulis: pembaca melihat snapshot terakhir
+# yang sudah commit.
+POOL_SIZE = 5
+POOL_MAX_OVERFLOW = 10
+POOL_TIMEOUT_S = 10
+
+READ_PRAGMAS = {
+    'query_only': 'ON',
+    'busy_timeout': 5000,          # ms; tunggu sebentar saat checkpoint WAL
+    'cache_size': -32768,          # 32 MB page cache per koneksi (negatif = KiB)
+    'mmap_size': 268435456,        # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
+
+def ensure_wal_mode(db_path):
+    """Pastikan database dalam mode WAL (persisten di file; biasanya sudah diset ETL).
+
+    Koneksi read-only tidak bisa mengganti journal_mode, jadi dicek sekali
+    dengan koneksi biasa saat engine dibuat.
+    """
+    if not pathlib.Path(db_path).exists():
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != 'wal':
+            mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        return mode
+    except sqlite3.OperationalError as e:
+        print(f"   [WARNING] Gagal mengaktifkan WAL di {db_path}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def create_readonly_engine(db_path, factory=sqlite3.Connection):
+    """Engine SQLAlchemy dengan pool koneksi read-only yang thread-safe.
+
+    factory: kelas koneksi sqlite3 (misal api_metrics.TimedConnection).
+    """
+    ensure_wal_mode(db_path)
+    uri = pathlib.Path(db_path).resolve().as_uri() + '?mode=ro'
+
+    def connect():
+        # check_same_thread=False: koneksi berpindah thread lewat pool,
+        # tapi selalu dipakai satu thread pada satu waktu
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, factory=factory)
+
+    engine = create_engine('sqlite://', creator=connect, poolclass=pool.QueuePool,
+                           pool_size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                           pool_timeout=POOL_TIMEOUT_S)
+
+    @event.listens_for(engine, 'connect')
+    def apply_read_pragmas(dbapi_conn, connection_record):
+        for pragma, value in READ_PRAGMAS.items():
+            dbapi_conn.execute(f"PRAGMA {pragma} = {value}")
+
+    return engine
@@ -0,0 +1,158 @@
+import csv
+import io
+
+from sqlalchemy import text
+
+# pyarrow opsional: hanya dibutuhkan untuk format=parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# --- EXPORT FactSales (STREAMING) ---
+# Dipakai app.py (/api/export). Baris FactSales + atribut dimensi dibaca dari
+# cursor per EXPORT_BATCH_ROWS baris dan langsung dikirim sebagai potongan CSV
+# atau row group Parquet lewat generator, jadi memori per request tetap kecil
+# berapa pun jumlah baris yang diexport. Sengaja tanpa ORDER BY: sort seluruh
+# hasil akan ditampung SQLite di memori (temp_store = MEMORY).
+EXPORT_BATCH_ROWS = 5000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# (kolom output, ekspresi SQL, tipe Parquet)
+EXPORT_COLUMNS = [
+    ('Order_Number', 'f.Order_Number', 'string'),
+    ('Order_Date', 'f.Order_Date', 'date32'),
+    ('Ship_Date', 'f.Ship_Date', 'date32'),
+    ('Due_Date', 'f.Due_Date', 'date32'),
+    ('Order_Year', 'f.Order_Year', 'int16'),
+    ('Order_Month', 'f.Order_Month', 'int8'),
+    ('Product_Key', 'f.Product_Key', 'string'),
+    ('Product_Name', 'p.Product_Name', 'string'),
+    ('Product_Line', 'p.Product_Line', 'string'),
+    ('Category', 'p.Category', 'string'),
+    ('Subcategory', 'p.Subcategory', 'string'),
+    ('Customer_ID', 'f.Customer_ID', 'int64'),
+    ('Customer_Name', 'c.Full_Name', 'string'),
+    ('Country', 'c.Country', 'string'),
+    ('Quantity', 'f.Quantity', 'int32'),
+    ('Unit_Price', 'f.Unit_Price', 'float64'),
+    ('Sales_Amount', 'f.Sales_Amount', 'float64'),
+]
+
+# Versi produk (SCD) yang berlaku saat order -> Product_SK, jadi nama/kategori
+# yang diexport adalah atribut produk pada tanggal transaksi
+EXPORT_QUERY = """
+    SELECT {columns}
+    FROM FactSales f
+    LEFT JOIN DimProduct p ON p.Product_SK = f.Product_SK
+    LEFT JOIN DimCustomer c ON c.Customer_ID = f.Customer_ID
+    {where}
+"""
+
+def pyarrow_available():
+    return pa is not None
+
+def _in_filter(expr, values, prefix, params):
+    names = []
+    for i, value in enumerate(values):
+        params[f"{prefix}_{i}"] = value
+        names.append(f":{prefix}_{i}")
+    return f"{expr} IN ({', '.join(names)})"
+
+def export_query(years=(), products=(), customers=()):
+    """SQL + parameter export; filter kosong = semua baris.
+
+    years     : list tahun order (int)
+    products  : list Product_Key (semua versi produk)
+    customers : list Customer_ID (int)
+    """
+    params = {}
+    conditions = []
+    if years:
+        conditions.append(_in_filter('f.Order_Year', years, 'year', params))
+    if products:
+        conditions.append(_in_filter('f.Product_Key', products, 'product', params))
+    if customers:
+        conditions.append(_in_filter('f.Customer_ID', customers, 'customer', params))
+    sql = EXPORT_QUERY.format(columns=', '.join(expr for _, expr, _ in EXPORT_COLUMNS),
+                              where=f"WHERE {' AND '.join(conditions)}" if conditions else '')
+    return text(sql), params
+
+def iter_batches(conn, query, params):
+    """Baris hasil query per EXPORT_BATCH_ROWS (cursor dibaca bertahap)"""
+    result = conn.execute(query, params)
+    try:
+        while True:
+            rows = result.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                return
+            yield rows
+    finally:
+        result.close()
+
+def iter_csv(batches):
+    """Generator bytes CSV (header + satu potongan per batch)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow([name for name, _, _ in EXPORT_COLUMNS])
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header tetap dikirim walaupun hasilnya kosong
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+class _StreamSink(io.RawIOBase):
+    """File tujuan ParquetWriter yang menampung byte sampai diambil dengan drain()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_schema():
+    return pa.schema([(name, getattr(pa, type_name)()) for name, _, type_name in EXPORT_COLUMNS])
+
+def iter_parquet(batches):
+    """Generator bytes Parquet: satu row group per batch, footer di potongan terakhir"""
+    if pa is None:
+        raise ImportError("Export Parquet membutuhkan pyarrow (pip install pyarrow)")
+    schema = export_schema()
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            columns = list(zip(*rows))
+            arrays = []
+            for values, field in zip(columns, schema):
+                if pa.types.is_date32(field.type):
+                    # Tanggal disimpan sebagai teks 'YYYY-MM-DD' di SQLite
+                    arrays.append(pa.array(values, pa.string()).cast(field.type))
+                else:
+                    arrays.append(pa.array(values, field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,100 @@
+from sqlalchemy import text
+import base64
+import json
+
+# --- DAFTAR PRODUK & CUSTOMER (KEYSET PAGINATION) ---
+# Dipakai app.py (/api/products_list, /api/customers_list) dan dashboard.py.
+# Halaman berikutnya dicari dengan "WHERE (kolom sort, key) > (nilai terakhir)"
+# memakai index (lihat WAREHOUSE_INDEXES / AGGREGATE_INDEXES di ETL_pipeline.py),
+# bukan OFFSET, jadi halaman ke-N sama murahnya dengan halaman pertama.
+# Kolom sort & search harus NOT NULL (perbandingan row value dengan NULL selalu gagal).
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+
+LISTS = {
+    'products': {
+        'table': 'AggProductSales',
+        'columns': "Product_Name, Product_Line, Total_Sales AS sales",
+        'key': 'Product_Name',
+        'sorts': {'sales': 'Total_Sales', 'name': 'Product_Name COLLATE NOCASE'},
+        'default_sort': ('sales', 'desc'),
+        'search': 'Product_Name COLLATE NOCASE',
+    },
+    'customers': {
+        'table': 'DimCustomer',
+        'columns': "Customer_ID AS id, Full_Name AS name, Country AS country",
+        'key': 'Customer_ID',
+        # Full_Name dideklarasikan COLLATE NOCASE di DimCustomer
+        'sorts': {'id': 'Customer_ID', 'name': 'Full_Name', 'country': 'Country'},
+        'default_sort': ('id', 'asc'),
+        'search': 'Full_Name',
+    },
+}
+
+def encode_cursor(sort_value, key_value):
+    """Cursor = base64 url-safe dari [nilai sort, key] baris terakhir halaman"""
+    raw = json.dumps([sort_value, key_value]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Kebalikan encode_cursor(); ValueError jika cursor rusak"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, key_value = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Cursor tidak valid: {cursor!r}")
+    return sort_value, key_value
+
+def prefix_range(prefix):
+    """'Jon' -> ('jon', 'joo'): range [lo, hi) untuk prefix search yang memakai index.
+
+    Pembanding memakai COLLATE NOCASE (huruf ASCII dianggap kecil),
+    jadi batas dibuat dari prefix huruf kecil.
+    """
+    lo = prefix.lower()
+    return lo, lo[:-1] + chr(ord(lo[-1]) + 1)
+
+def query_list_page(conn, name, sort=None, order=None, q=None, cursor=None, limit=None):
+    """Satu halaman list 'products' / 'customers'.
+
+    sort/order : kolom di LISTS[name]['sorts'] dan 'asc'/'desc' (default per list)
+    q          : prefix nama (case-insensitive)
+    cursor     : next_cursor dari halaman sebelumnya
+    Mengembalikan {'items': [...], 'next_cursor': str atau None}.
+    """
+    spec = LISTS[name]
+    default_sort, default_order = spec['default_sort']
+    if sort not in spec['sorts']:
+        sort = default_sort
+    if order not in ('asc', 'desc'):
+        order = default_order if sort == default_sort else 'asc'
+    limit = min(max(int(limit or LIST_PAGE_SIZE), 1), LIST_MAX_PAGE_SIZE)
+    sort_expr = spec['sorts'][sort]
+    key = spec['key']
+
+    conditions = []
+    params = {'limit': limit + 1}  # +1 baris untuk tahu apakah masih ada halaman berikutnya
+    if q and q.strip():
+        params['q_lo'], params['q_hi'] = prefix_range(q.strip())
+        conditions.append(f"{spec['search']} >= :q_lo AND {spec['search']} < :q_hi")
+    if cursor:
+        params['c_sort'], params['c_key'] = decode_cursor(cursor)
+        op = '>' if order == 'asc' else '<'
+        conditions.append(f"({sort_expr}, {key}) {op} (:c_sort, :c_key)")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = text(f"""
+        SELECT {spec['columns']}, {sort_expr} AS _sort, {key} AS _key
+        FROM {spec['table']}
+        {where}
+        ORDER BY {sort_expr} {order}, {key} {order}
+        LIMIT :limit
+    """)
+    rows = conn.execute(query, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._sort, rows[-1]._key)
+    items = [{k: v for k, v in row._mapping.items() if k not in ('_sort', '_key')} for row in rows]
+    return {'items': items, 'next_cursor': next_cursor}